@@ -23,16 +23,25 @@ def run_tests():
         subprocess.run([sys.executable, "-m", "pip", "install", "pytest", "pytest-cov"], check=True)
         import pytest
     
-    # Run tests with coverage
-    print("Running tests...")
-    exit_code = pytest.main([
+    args = [
         "tests/",
         "-v",
         "--cov=src",
         "--cov-report=term-missing",
         "--cov-report=html",
         "-x",  # Stop on first failure
-    ])
+    ]
+    
+    # Tests share no state across workers, so spread them over all cores when possible
+    try:
+        import xdist  # noqa: F401
+        args += ["-n", "auto"]
+    except ImportError:
+        pass
+    
+    # Run tests with coverage
+    print("Running tests...")
+    exit_code = pytest.main(args)
     
     if exit_code == 0:
         print("\n✅ All tests passed!")
@@ -43,6 +43,7 @@ setup(
             "flake8>=4.0.0",
             "mypy>=0.950",
             "pytest-cov>=3.0.0",
+            "pytest-xdist>=3.0.0",
         ],
     },
     entry_points={
@@ -36,6 +36,7 @@ def cli():
 @click.option('--environment', '-e', default='dev', help='Environment to compile for')
 @click.option('--config', '-c', help='Configuration file')
 @click.option('--split-files/--single-file', default=True, help='Split output into multiple files')
+@click.option('--output-format', type=click.Choice(['yaml', 'json']), default='yaml', help='Serialization for compiled files (JSON is valid YAML)')
 @click.option('--auto-variants/--no-auto-variants', default=True, help='Generate auto variants')
 @click.option('--validate/--no-validate', default=True, help='Validate metrics')
 @click.option('--json-output', is_flag=True, help='Output JSON report')
@@ -44,7 +45,7 @@ def cli():
 @click.option('--pre-validate/--no-pre-validate', default=True, help='Run pre-compilation checks')
 @click.option('--report-format', type=click.Choice(['terminal', 'json', 'junit']), default='terminal', help='Error report format')
 def compile(input_dir, output_dir, template_dir, dimension_group_dir, 
-           environment, config, split_files, auto_variants, validate, json_output, 
+           environment, config, split_files, output_format, auto_variants, validate, json_output, 
            debug, verbose, pre_validate, report_format):
     """Compile better-dbt-metrics YAML to dbt semantic models"""
     
@@ -71,7 +72,8 @@ def compile(input_dir, output_dir, template_dir, dimension_group_dir,
         split_files=split_files,
         auto_variants=auto_variants,
         validate=validate,
-        debug=effective_debug
+        debug=effective_debug,
+        output_format=output_format
     )
     
     # Initialize error collector
@@ -3,14 +3,24 @@ Core Compiler for Better-DBT-Metrics
 Compiles better-dbt-metrics YAML to dbt semantic models
 """
 
+import hashlib
+import io
+import json
+import marshal
+import os
+import sys
 import yaml
+from collections import OrderedDict
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Set, Tuple
-from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Any, Mapping, Optional, Set, Tuple
+from dataclasses import dataclass, field, fields
 from copy import deepcopy
+from datetime import date, datetime
 
-from core.parser import BetterDBTParser
+from core.parser import BetterDBTParser, clear_yaml_cache, load_yaml
 from features.templates import TemplateLibrary
+from features.file_discovery import iter_yaml_files
 from features.dimension_groups import DimensionGroupManager
 from features.auto_inference import AutoInferenceEngine, InferenceConfig, ColumnInfo
 from core.config_loader import ConfigLoader, BDMConfig
@@ -29,14 +39,74 @@ class CompilerConfig:
     auto_variants: bool = True
     generate_tests: bool = True
     debug: bool = False
+    output_format: str = "yaml"  # "yaml" or "json" (JSON is valid YAML, and much faster to emit)
+    emit_files: bool = True  # Write compiled output to output_dir
+    cache: bool = False  # Reuse results for unchanged inputs within this process
+    cache_dir: Optional[str] = None  # With cache, also keep results here across runs; use a directory only you can write
     
 
+# Compilation results keyed by _compile_cache_key, shared by every compiler in the process
+_COMPILE_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_COMPILE_CACHE_SIZE = 64
+
+# Compiler attributes restored from the cache on a hit
+_CACHED_STATE = (
+    'compiled_metrics', 'semantic_models', 'metrics_by_source', 'entities', 'entity_sets',
+    'time_spines', 'join_paths', 'join_path_aliases', 'offset_patterns', 'metric_aliases',
+    'compiled_output'
+)
+
+# libyaml's emitter when PyYAML was built with it
+_YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
+def _json_default(value: Any) -> Any:
+    """Convert the non-JSON values safe_load can produce; reject anything else"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# Config fields that only affect how output is written
+_OUTPUT_ONLY_OPTIONS = {'output_dir', 'output_format', 'emit_files', 'cache', 'cache_dir'}
+
+# Digest of the package's Python source, so results cached on disk by an
+# older version of the compiler are never reused; computed on first use
+_SOURCE_DIGEST: Optional[str] = None
+
+
+def _source_digest() -> str:
+    """Hash every Python file in the package, once per process"""
+    global _SOURCE_DIGEST
+    if _SOURCE_DIGEST is None:
+        digest = hashlib.sha256()
+        package_root = Path(__file__).resolve().parent.parent
+        for source_file in sorted(package_root.rglob("*.py")):
+            digest.update(source_file.read_bytes())
+        _SOURCE_DIGEST = digest.hexdigest()
+    return _SOURCE_DIGEST
+
+
+def _intern_name(item: Dict[str, Any]) -> str:
+    """Intern item['name'] in place and return it"""
+    name = item['name']
+    if type(name) is str:
+        name = item['name'] = sys.intern(name)
+    return name
+
+
 class BetterDBTCompiler:
     """
     Main compiler that orchestrates the compilation process
     """
     
     def __init__(self, config: CompilerConfig):
+        self._configure(config)
+        self.reset()
+        
+    def _configure(self, config: CompilerConfig):
+        """Set up everything derived from the compiler configuration"""
         self.config = config
         
         # Load BDM configuration
@@ -55,8 +125,6 @@ class BetterDBTCompiler:
             import_mappings=self.bdm_config.import_mappings,
             search_paths=self.bdm_config.search_paths
         )
-        self.templates = TemplateLibrary(config.template_dirs)
-        self.dimension_groups = DimensionGroupManager()
         
         # Initialize auto-inference engine
         inference_config = InferenceConfig()
@@ -88,6 +156,21 @@ class BetterDBTCompiler:
                 
         self.auto_inference = AutoInferenceEngine(inference_config)
         
+    def reset(self):
+        """
+        Clear all compilation state so the compiler can be run again.
+        The configuration, auto-inference engine and any cached dbt project
+        scan are kept; templates and dimension groups registered from
+        previously compiled files are dropped.
+        """
+        self.templates = TemplateLibrary(self.config.template_dirs)
+        self.dimension_groups = DimensionGroupManager()
+        
+        self.parser.imports_cache.clear()
+        self.parser.import_stack.clear()
+        self.parser.current_file = None
+        self.parser.current_data = {}
+        
         # Track compilation state
         self.compiled_metrics: List[Dict[str, Any]] = []
         self.semantic_models: List[Dict[str, Any]] = []
@@ -99,33 +182,173 @@ class BetterDBTCompiler:
         self.join_paths: List[Dict[str, Any]] = []  # Store join path definitions
         self.join_path_aliases: Dict[str, Dict[str, Any]] = {}  # Store join path aliases
         self.offset_patterns: Dict[str, List[Dict[str, Any]]] = {}  # Store offset window patterns
+        self.metric_aliases: Dict[str, str] = {}  # Map deduplicated metrics to their canonical names
+        self.compiled_output: Dict[str, Any] = {}  # dbt output from the last compile
+        self.compiled_metrics_by_name: Dict[str, Dict[str, Any]] = {}  # Filled after each compile
+        self.semantic_models_by_name: Dict[str, Dict[str, Any]] = {}
+        self.measures_by_name: Dict[str, Dict[str, Any]] = {}  # Measures of every semantic model
+        
+    @staticmethod
+    def warmup(project_dir: str = "."):
+        """
+        Do the once-per-process setup ahead of the first compile: import the
+        validation package, hash the compiler source for the compile cache and
+        scan the dbt project in project_dir. Every later compile in the
+        process reuses that scan (see DBTProjectScanner.preload).
+        """
+        from validation.dbt_scanner import DBTProjectScanner
+        _source_digest()
+        DBTProjectScanner.preload(project_dir)
+        
+    @staticmethod
+    def clear_compile_cache():
+        """Drop the compilations cached in this process (cache_dir is left alone)"""
+        _COMPILE_CACHE.clear()
+        
+    @staticmethod
+    def clear_yaml_cache():
+        """Drop the parsed YAML texts the parser keeps between compiles"""
+        clear_yaml_cache()
+        
+    def reconfigure(self, config: CompilerConfig):
+        """Switch this compiler to a new configuration and reset its state"""
+        self._configure(config)
+        self.reset()
+        
+    def compile_directory(self, input_dir: Optional[str] = None,
+                          return_summary: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Compile all metrics files in a directory
+        
+        Returns a summary of the run (files processed, metric and model counts,
+        errors). Callers that only need the written output can pass
+        return_summary=False to skip building it and get None back.
+        """
+        results, output_data = self._compile_directory(input_dir)
+        return self._finish(results, output_data, return_summary)
+        
+    def compile_sources(self, sources: Mapping[str, str],
+                        return_summary: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Compile metrics YAML already held in memory, keyed by file name
+        relative to the input directory, exactly as compile_directory would
+        compile those files. Nothing is read from the input directory;
+        imports still resolve against it.
+        """
+        input_path = Path(self.config.input_dir)
+        sources = {str(input_path / name): text for name, text in sources.items()}
+        
+        if self.config.validate:
+            self._check_validation(self._new_validator().validate_sources(sources))
+            
+        documents = (
+            (Path(name), partial(self.compile_source, text, name))
+            for name, text in sources.items()
+        )
+        results, output_data = self._compile_documents(documents)
+        return self._finish(results, output_data, return_summary)
+        
+    def compile_parsed(self, documents: Mapping[str, Dict[str, Any]],
+                       return_summary: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Like compile_sources, for documents that are already loaded from
+        YAML. The documents are copied, not modified, so they can be reused.
+        """
+        input_path = Path(self.config.input_dir)
+        documents = {str(input_path / name): data for name, data in documents.items()}
+        
+        if self.config.validate:
+            self._check_validation(self._new_validator().validate_documents(documents))
+            
+        results, output_data = self._compile_documents(
+            (Path(name), partial(self.compile_data, data, name))
+            for name, data in documents.items()
+        )
+        return self._finish(results, output_data, return_summary)
+        
+    def _finish(self, results: Dict[str, Any], output_data: Dict[str, Any],
+                return_summary: bool) -> Optional[Dict[str, Any]]:
+        """Write the compiled output and build the run summary"""
+        # Write output files
+        if self.config.emit_files:
+            if self.config.split_files:
+                self._write_split_output(output_data)
+            else:
+                self._write_single_output(output_data)
+            
+        if not return_summary:
+            return None
+            
+        results['metrics_compiled'] = len(output_data.get('metrics', []))
+        results['models_generated'] = len(output_data.get('semantic_models', []))
+        return results
+        
+    def compile_to_dict(self, input_dir: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Compile all metrics files in a directory and return the dbt output
+        ({'semantic_models': [...], 'metrics': [...]}) without writing any files
+        """
+        _, output_data = self._compile_directory(input_dir)
+        return output_data
         
-    def compile_directory(self, input_dir: Optional[str] = None) -> Dict[str, Any]:
-        """Compile all metrics files in a directory"""
+    def _compile_directory(self, input_dir: Optional[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Compile a directory into (run summary, dbt output data)"""
         input_path = Path(input_dir or self.config.input_dir)
         
         if not input_path.exists():
             raise ValueError(f"Input directory not found: {input_path}")
-        
-        # Run validation first if enabled
+            
+        # Run validation first if enabled; cached results are never served
+        # without it, since the dbt project it checks against is not part
+        # of the cache key
         if self.config.validate:
-            if self.config.debug:
-                print("[DEBUG] Running pre-compilation validation...")
-            
-            from validation.validator import MetricsValidator
-            validator = MetricsValidator(".")
-            validation_result = validator.validate_directory(str(input_path))
-            
-            if validation_result.has_errors():
-                print("\n❌ Validation failed - metrics have errors that must be fixed:")
-                validation_result.print_summary()
-                raise ValueError("Cannot compile metrics with validation errors. Please fix the issues above.")
-            elif validation_result.warnings:
-                print("\n⚠️  Validation warnings (compilation will continue):")
-                validation_result.print_summary()
-            else:
-                print("✅ Validation passed - all metric references are valid")
+            self._check_validation(self._new_validator().validate_directory(str(input_path)))
+            
+        # Only a fresh compiler can take (or seed) a cached result
+        cache_key = None
+        if self.config.cache and not self.compiled_metrics and not self.semantic_models:
+            cache_key = self._compile_cache_key(input_path)
+            cached = self._load_cached(cache_key)
+            if cached is not None:
+                for name in _CACHED_STATE:
+                    setattr(self, name, cached[name])
+                self._index_by_name()
+                if self.config.debug:
+                    print(f"[DEBUG] Reusing cached compilation of {input_path}")
+                return cached['results'], self.compiled_output
+        
+        documents = (
+            (yaml_file, partial(self.compile_file, yaml_file))
+            for yaml_file in iter_yaml_files(input_path)
+        )
+        return self._compile_documents(documents, cache_key)
+        
+    def _new_validator(self):
+        """A validator for the pre-compilation validation run"""
+        if self.config.debug:
+            print("[DEBUG] Running pre-compilation validation...")
+            
+        from validation.validator import MetricsValidator
+        return MetricsValidator(".")
+        
+    def _check_validation(self, validation_result):
+        """Report pre-compilation validation results; raise if there are errors"""
+        if validation_result.has_errors():
+            print("\n❌ Validation failed - metrics have errors that must be fixed:")
+            validation_result.print_summary()
+            raise ValueError("Cannot compile metrics with validation errors. Please fix the issues above.")
+        elif validation_result.warnings:
+            print("\n⚠️  Validation warnings (compilation will continue):")
+            validation_result.print_summary()
+        else:
+            print("✅ Validation passed - all metric references are valid")
             
+    def _compile_documents(self, documents: Iterable[Tuple[Path, Callable[[], Any]]],
+                           cache_key: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Compile (file path, compile function) pairs into (run summary, dbt
+        output data); the path decides whether a document is skipped
+        """
         # Load dimension groups first
         self._load_dimension_groups()
         
@@ -139,7 +362,7 @@ class BetterDBTCompiler:
             'skipped_metrics': []
         }
         
-        for yaml_file in input_path.rglob("*.yml"):
+        for yaml_file, compile_document in documents:
             # Skip non-metrics files
             if yaml_file.name.startswith('_'):
                 continue
@@ -152,7 +375,7 @@ class BetterDBTCompiler:
                 
             results['files_processed'] += 1
             try:
-                self.compile_file(yaml_file)
+                compile_document()
             except Exception as e:
                 if self.config.debug:
                     print(f"\n[DEBUG] Error compiling {yaml_file}:")
@@ -183,16 +406,111 @@ class BetterDBTCompiler:
         
         # Generate output
         output_data = self._generate_output()
-        results['metrics_compiled'] = len(output_data.get('metrics', []))
-        results['models_generated'] = len(output_data.get('semantic_models', []))
+        self.compiled_output = output_data
+        self._index_by_name()
         
-        # Write output files
-        if self.config.split_files:
-            self._write_split_output(output_data)
-        else:
-            self._write_single_output(output_data)
+        if cache_key is not None:
+            snapshot = {name: getattr(self, name) for name in _CACHED_STATE}
+            snapshot['results'] = results
+            self._store_cached(cache_key, snapshot)
+        
+        return results, output_data
+        
+    def _load_cached(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        A private copy of the cached compilation for cache_key, from this
+        process or, with cache_dir set, from an earlier run; None on a miss
+        """
+        if cache_key not in _COMPILE_CACHE and self.config.cache_dir:
+            cache_file = Path(self.config.cache_dir) / f"{cache_key}.marshal"
+            try:
+                with open(cache_file, 'rb') as f:
+                    self._remember(cache_key, marshal.load(f))
+            except (OSError, EOFError, ValueError, TypeError):
+                # Missing or unreadable entries are recompiled and rewritten
+                pass
+                
+        if cache_key not in _COMPILE_CACHE:
+            return None
+        _COMPILE_CACHE.move_to_end(cache_key)
+        return deepcopy(_COMPILE_CACHE[cache_key])
+        
+    def _store_cached(self, cache_key: str, snapshot: Dict[str, Any]):
+        """Cache a compilation in this process and, with cache_dir set, on disk"""
+        snapshot = deepcopy(snapshot)
+        self._remember(cache_key, snapshot)
+        
+        if self.config.cache_dir:
+            # marshal is not safe against crafted data; only point cache_dir at a trusted directory
+            try:
+                data = marshal.dumps(snapshot)
+            except ValueError:
+                # e.g. dates from YAML; such results are only cached in memory
+                if self.config.debug:
+                    print(f"[DEBUG] Compilation is not plain data; not writing it to {self.config.cache_dir}")
+                return
+            cache_dir = Path(self.config.cache_dir)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so concurrent runs never read a partial entry
+            temp_file = cache_dir / f"{cache_key}.{os.getpid()}.tmp"
+            temp_file.write_bytes(data)
+            os.replace(temp_file, cache_dir / f"{cache_key}.marshal")
+            
+    @staticmethod
+    def _remember(cache_key: str, snapshot: Dict[str, Any]):
+        """Add a snapshot to the in-process cache, evicting the least recently used"""
+        _COMPILE_CACHE[cache_key] = snapshot
+        if len(_COMPILE_CACHE) > _COMPILE_CACHE_SIZE:
+            _COMPILE_CACHE.popitem(last=False)
+        
+    def _index_by_name(self):
+        """
+        Index compiled metrics, semantic models and their measures by name;
+        the first definition of a name wins. Names are interned, so lookups
+        with literal keys usually match on identity.
+        """
+        self.compiled_metrics_by_name = {}
+        for metric in self.compiled_metrics:
+            self.compiled_metrics_by_name.setdefault(_intern_name(metric), metric)
+        self.semantic_models_by_name = {}
+        self.measures_by_name = {}
+        for sm in self.semantic_models:
+            self.semantic_models_by_name.setdefault(_intern_name(sm), sm)
+            for measure in sm.get('measures', []):
+                self.measures_by_name.setdefault(_intern_name(measure), measure)
             
-        return results
+    def _compile_cache_key(self, input_path: Path) -> str:
+        """
+        Hash the compiler's source and Python version, the options that
+        shape compiled output and the resolved bdm_config.yml settings
+        together with every YAML file under the input, template and
+        dimension group directories.
+        Imports from outside those directories and the dbt project scanned
+        during validation are not part of the key.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{_source_digest()}\n".encode())
+        # Entries on disk are marshal data, whose format varies between Pythons
+        digest.update(f"python={sys.version_info[:2]} marshal={marshal.version}\n".encode())
+        for option in fields(self.config):
+            if option.name not in _OUTPUT_ONLY_OPTIONS:
+                digest.update(f"{option.name}={getattr(self.config, option.name)!r}\n".encode())
+        # bdm_config.yml may be found outside the input directory (e.g. the cwd)
+        for setting in fields(self.bdm_config):
+            digest.update(f"bdm.{setting.name}={getattr(self.bdm_config, setting.name)!r}\n".encode())
+                
+
+        roots = [input_path] + [Path(d) for d in self.config.template_dirs + self.config.dimension_group_dirs]
+        for root in roots:
+            root = root.resolve()
+            digest.update(f"{root}\n".encode())
+            if not root.is_dir():
+                continue
+            for yaml_file in sorted(iter_yaml_files(root, (".yml", ".yaml"))):
+                content = yaml_file.read_bytes()
+                digest.update(f"{yaml_file.relative_to(root)}:{len(content)}\n".encode())
+                digest.update(content)
+        return digest.hexdigest()
         
     def compile_file(self, file_path: Path) -> Dict[str, Any]:
         """Compile a single metrics file"""
@@ -203,8 +521,26 @@ class BetterDBTCompiler:
         self.current_file = file_path
         
         # Parse file with imports and references
-        parsed_data = self.parser.parse_file(str(file_path))
+        return self._compile_parsed(self.parser.parse_file(str(file_path)))
+        
+    def compile_source(self, text: str, source_name: str) -> Dict[str, Any]:
+        """Compile metrics YAML text as if it had been read from the file source_name"""
+        if self.config.debug:
+            print(f"\n[DEBUG] === Compiling source: {source_name} ===")
+            
+        self.current_file = Path(source_name)
+        return self._compile_parsed(self.parser.parse_string(text, source_name))
         
+    def compile_data(self, data: Dict[str, Any], source_name: str) -> Dict[str, Any]:
+        """Compile an already-loaded metrics document as if it had been read from source_name"""
+        if self.config.debug:
+            print(f"\n[DEBUG] === Compiling document: {source_name} ===")
+            
+        self.current_file = Path(source_name)
+        return self._compile_parsed(self.parser.parse_data(data, source_name))
+        
+    def _compile_parsed(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Register and compile everything in one parsed metrics document"""
         if self.config.debug and 'metrics' in parsed_data:
             print(f"[DEBUG] Raw parsed metrics: {parsed_data['metrics']}")
         
@@ -418,7 +754,7 @@ class BetterDBTCompiler:
                 
             for yaml_file in dim_path.glob("*.yml"):
                 with open(yaml_file, 'r') as f:
-                    data = yaml.safe_load(f)
+                    data = load_yaml(f.read())
                     
                 if 'dimension_groups' in data:
                     for name, group_def in data['dimension_groups'].items():
@@ -2549,7 +2885,6 @@ class BetterDBTCompiler:
     def _get_metric_signature(self, metric: Dict[str, Any]) -> str:
         """Generate a unique signature for a metric based on its configuration"""
         import hashlib
-        import json
         
         # Extract the key fields that define metric uniqueness
         signature_data = {
@@ -2562,7 +2897,14 @@ class BetterDBTCompiler:
             'denominator': metric.get('denominator'),
             'expression': metric.get('expression'),
             'formula': metric.get('formula'),
-            'comparison': metric.get('comparison')  # For time comparison variants
+            'comparison': metric.get('comparison'),  # For time comparison variants
+            # Cumulative settings - metrics that only differ by window or
+            # offsets are distinct metrics, not duplicates
+            'window': metric.get('window'),
+            'window_type': metric.get('window_type'),
+            'grain_to_date': metric.get('grain_to_date'),
+            'offsets': metric.get('offsets'),
+            'offset_pattern': metric.get('offset_pattern')
         }
         
         # Remove None values and sort for consistency
@@ -2700,6 +3042,21 @@ class BetterDBTCompiler:
         self.semantic_models.append(semantic_model)
         return semantic_model
         
+    def _dump_output(self, data: Dict[str, Any], stream, sort_keys: bool = True):
+        """Serialize compiled output to a stream in the configured format"""
+        if self.config.output_format == 'json':
+            # JSON is a subset of YAML, so dbt reads the .yml files unchanged
+            json.dump(data, stream, indent=2, sort_keys=sort_keys, default=_json_default)
+            stream.write('\n')
+        else:
+            yaml.dump(data, stream, Dumper=_YAML_DUMPER, default_flow_style=False, sort_keys=sort_keys)
+            
+    def _write_output_file(self, file_path: Path, data: Dict[str, Any], sort_keys: bool = True):
+        """Serialize output in memory, then write the file in one go"""
+        buffer = io.StringIO()
+        self._dump_output(data, buffer, sort_keys=sort_keys)
+        file_path.write_text(buffer.getvalue())
+            
     def _write_split_output(self, output_data: Dict[str, Any]):
         """Write output to separate files"""
         try:
@@ -2712,8 +3069,7 @@ class BetterDBTCompiler:
             for model in output_data['semantic_models']:
                 file_path = output_path / f"{model['name']}.yml"
                 try:
-                    with open(file_path, 'w') as f:
-                        yaml.dump({'semantic_models': [model]}, f, default_flow_style=False)
+                    self._write_output_file(file_path, {'semantic_models': [model]})
                     written_files.append(file_path)
                 except IOError as e:
                     raise IOError(f"Failed to write semantic model {model['name']}: {e}")
@@ -2721,8 +3077,7 @@ class BetterDBTCompiler:
             # Write metrics
             metrics_file = output_path / "_metrics.yml"
             try:
-                with open(metrics_file, 'w') as f:
-                    yaml.dump({'metrics': output_data['metrics']}, f, default_flow_style=False)
+                self._write_output_file(metrics_file, {'metrics': output_data['metrics']})
                 written_files.append(metrics_file)
             except IOError as e:
                 raise IOError(f"Failed to write metrics file: {e}")
@@ -2740,8 +3095,7 @@ class BetterDBTCompiler:
             
             output_file = output_path / "compiled_semantic_models.yml"
             try:
-                with open(output_file, 'w') as f:
-                    yaml.dump(output_data, f, default_flow_style=False, sort_keys=False)
+                self._write_output_file(output_file, output_data, sort_keys=False)
                 return [output_file]
             except IOError as e:
                 raise IOError(f"Failed to write output file: {e}")
@@ -2759,7 +3113,7 @@ class BetterDBTCompiler:
             
             # Initialize scanner if not already done
             if not hasattr(self, '_model_scanner'):
-                self._model_scanner = DBTProjectScanner(str(self.parser.base_dir))
+                self._model_scanner = DBTProjectScanner.for_project(str(self.parser.base_dir))
             
             # Check main source reference
             source = metric.get('source')
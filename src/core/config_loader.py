@@ -9,6 +9,10 @@ from typing import Dict, Any, Optional, List
 from dataclasses import dataclass, field
 
 
+# libyaml's loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
 @dataclass
 class BDMConfig:
     """Better-DBT-Metrics configuration"""
@@ -120,7 +124,7 @@ class ConfigLoader:
         # Load and parse config file
         try:
             with open(config_file, 'r') as f:
-                config_data = yaml.safe_load(f)
+                config_data = yaml.load(f, Loader=_YAML_LOADER)
                 
             if not isinstance(config_data, dict):
                 raise ValueError(f"Invalid config file format: {config_file}")
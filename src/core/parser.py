@@ -5,13 +5,57 @@ Supports imports, references ($ref, $use), and template inheritance
 
 import yaml
 import os
+import sys
+import marshal
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Set, Tuple
+from typing import Dict, List, Any, Optional, Set, Tuple, Callable
 from dataclasses import dataclass, field
 import re
 from copy import deepcopy
 
 
+class KeyInterningLoader(getattr(yaml, 'CSafeLoader', yaml.SafeLoader)):
+    """
+    Safe YAML loader (libyaml-backed when available) that interns mapping
+    keys, so the handful of field names repeated across every metric
+    ('name', 'type', 'source'...) share one string object each
+    """
+    
+    def construct_mapping(self, node, deep=False):
+        mapping = super().construct_mapping(node, deep=deep)
+        return {sys.intern(key) if isinstance(key, str) else key: value for key, value in mapping.items()}
+
+
+@lru_cache(maxsize=256)
+def _yaml_snapshot(text: str) -> Tuple[Callable[[Any], Any], Any]:
+    """
+    Parse YAML text once and keep a snapshot of it, with the function that
+    copies the snapshot out. Both marshal and deepcopy keep interned keys
+    interned; marshal is faster but can't hold dates and timestamps.
+    """
+    data = yaml.load(text, Loader=KeyInterningLoader)
+    try:
+        return marshal.loads, marshal.dumps(data)
+    except ValueError:
+        return deepcopy, data
+
+
+def load_yaml(text: str) -> Any:
+    """
+    Load YAML text with KeyInterningLoader. Texts seen before are copied
+    from a cached snapshot instead of re-parsed; every call returns fresh
+    objects, so callers may mutate the result.
+    """
+    loads, payload = _yaml_snapshot(text)
+    return loads(payload)
+
+
+def clear_yaml_cache():
+    """Drop the parsed YAML kept by load_yaml"""
+    _yaml_snapshot.cache_clear()
+
+
 @dataclass
 class Import:
     """Represents an import statement"""
@@ -47,6 +91,17 @@ class BetterDBTParser:
         self.import_mappings = import_mappings or {}  # Map import aliases to paths
         self.search_paths = search_paths or []  # Additional paths to search for imports
         
+    @property
+    def base_dir(self) -> Path:
+        """Directory that relative file and import paths are resolved against"""
+        return self._base_dir
+        
+    @base_dir.setter
+    def base_dir(self, base_dir) -> None:
+        self._base_dir = Path(base_dir)
+        # Cached imports were resolved against the previous base directory
+        self.imports_cache = {}
+        
     def parse_file(self, file_path: str) -> Dict[str, Any]:
         """Parse a better-dbt-metrics YAML file with all advanced features"""
         file_path = Path(file_path)
@@ -83,7 +138,7 @@ class BetterDBTParser:
         
         try:
             with open(file_path, 'r') as f:
-                data = yaml.safe_load(f)
+                data = load_yaml(f.read())
                 
             if not isinstance(data, dict):
                 raise ValueError(f"File {file_path} must contain a YAML dictionary")
@@ -97,57 +152,87 @@ class BetterDBTParser:
             raise RuntimeError(f"Error reading file {file_path}: {str(e)}")
                 
         try:
-            # Process imports first
-            if 'imports' in data:
-                self._process_imports(data['imports'], file_path.parent)
-                
-            # Process the rest of the document
-            processed_data = self._process_references(data)
+            return self._process_document(data, file_path)
+        finally:
+            self.import_stack.remove(abs_path_str)
             
-            # Process table references in source fields
-            processed_data = self._process_table_references(processed_data)
+    def parse_string(self, text: str, source_name: str = "<memory>") -> Dict[str, Any]:
+        """Parse better-dbt-metrics YAML text; relative imports resolve from base_dir"""
+        file_path = self.base_dir / source_name
+        self.current_file = file_path
+        
+        try:
+            data = load_yaml(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML in {source_name}: {str(e)}")
             
-            # Handle template inheritance for metrics
-            if 'metrics' in processed_data:
-                processed_data['metrics'] = self._process_metric_inheritance(processed_data['metrics'])
-                
-            # Handle template inheritance for semantic models
-            if 'semantic_models' in processed_data:
-                processed_data['semantic_models'] = self._process_semantic_model_inheritance(processed_data['semantic_models'])
-                
-            # Process entity sets if present
-            if 'entity_sets' in processed_data and 'semantic_models' in processed_data:
-                # Convert entity_sets list to dict for easier lookup
-                entity_sets_dict = {}
-                if isinstance(processed_data.get('entity_sets'), list):
-                    for entity_set in processed_data.get('entity_sets', []):
-                        if isinstance(entity_set, dict) and 'name' in entity_set:
-                            entity_sets_dict[entity_set['name']] = entity_set
-                elif isinstance(processed_data.get('entity_sets'), dict):
-                    entity_sets_dict = processed_data.get('entity_sets', {})
-                
-                # Convert entities list to dict for easier lookup
-                entities_dict = {}
-                if isinstance(processed_data.get('entities'), list):
-                    for entity in processed_data.get('entities', []):
-                        if isinstance(entity, dict) and 'name' in entity:
-                            entities_dict[entity['name']] = entity
-                elif isinstance(processed_data.get('entities'), dict):
-                    entities_dict = processed_data.get('entities', {})
-                
-                processed_data['semantic_models'] = self._apply_entity_sets(
-                    processed_data['semantic_models'], 
-                    entity_sets_dict,
-                    entities_dict
-                )
-                
-            # Store current data for compiler access
-            self.current_data = processed_data
-                
-            return processed_data
+        if not isinstance(data, dict):
+            raise ValueError(f"{source_name} must contain a YAML dictionary")
             
-        finally:
-            self.import_stack.remove(abs_path_str)
+        return self._process_document(data, file_path)
+        
+    def parse_data(self, data: Dict[str, Any], source_name: str = "<memory>") -> Dict[str, Any]:
+        """
+        Process an already-loaded YAML document as parse_string would; data
+        is copied first so callers can reuse it
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"{source_name} must contain a YAML dictionary")
+            
+        file_path = self.base_dir / source_name
+        self.current_file = file_path
+        return self._process_document(deepcopy(data), file_path)
+        
+    def _process_document(self, data: Dict[str, Any], file_path: Path) -> Dict[str, Any]:
+        """Resolve imports, references, inheritance and entity sets in a loaded document"""
+        # Process imports first
+        if 'imports' in data:
+            self._process_imports(data['imports'], file_path.parent)
+            
+        # Process the rest of the document
+        processed_data = self._process_references(data)
+        
+        # Process table references in source fields
+        processed_data = self._process_table_references(processed_data)
+        
+        # Handle template inheritance for metrics
+        if 'metrics' in processed_data:
+            processed_data['metrics'] = self._process_metric_inheritance(processed_data['metrics'])
+            
+        # Handle template inheritance for semantic models
+        if 'semantic_models' in processed_data:
+            processed_data['semantic_models'] = self._process_semantic_model_inheritance(processed_data['semantic_models'])
+            
+        # Process entity sets if present
+        if 'entity_sets' in processed_data and 'semantic_models' in processed_data:
+            # Convert entity_sets list to dict for easier lookup
+            entity_sets_dict = {}
+            if isinstance(processed_data.get('entity_sets'), list):
+                for entity_set in processed_data.get('entity_sets', []):
+                    if isinstance(entity_set, dict) and 'name' in entity_set:
+                        entity_sets_dict[entity_set['name']] = entity_set
+            elif isinstance(processed_data.get('entity_sets'), dict):
+                entity_sets_dict = processed_data.get('entity_sets', {})
+            
+            # Convert entities list to dict for easier lookup
+            entities_dict = {}
+            if isinstance(processed_data.get('entities'), list):
+                for entity in processed_data.get('entities', []):
+                    if isinstance(entity, dict) and 'name' in entity:
+                        entities_dict[entity['name']] = entity
+            elif isinstance(processed_data.get('entities'), dict):
+                entities_dict = processed_data.get('entities', {})
+            
+            processed_data['semantic_models'] = self._apply_entity_sets(
+                processed_data['semantic_models'], 
+                entity_sets_dict,
+                entities_dict
+            )
+            
+        # Store current data for compiler access
+        self.current_data = processed_data
+            
+        return processed_data
             
     def _process_imports(self, imports: List[Any], base_dir: Path):
         """Process import statements and load imported files"""
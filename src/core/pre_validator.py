@@ -8,6 +8,7 @@ from pathlib import Path
 from typing import Dict, Any, List, Set, Optional, Tuple
 import re
 
+from core.parser import load_yaml
 from core.error_handler import (
     ErrorCollector, CompilationError, ErrorFactory, 
     ErrorSeverity, ErrorCategory
@@ -70,7 +71,7 @@ class PreCompilationValidator:
         for yaml_file in yaml_files:
             try:
                 with open(yaml_file, 'r') as f:
-                    data = yaml.safe_load(f)
+                    data = load_yaml(f.read())
                     
                 if not data:
                     continue
@@ -125,7 +126,7 @@ class PreCompilationValidator:
         try:
             with open(file_path, 'r') as f:
                 content = f.read()
-                data = yaml.safe_load(content)
+                data = load_yaml(content)
         except yaml.YAMLError as e:
             # Try to extract line number from error
             line_number = None
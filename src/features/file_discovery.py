@@ -0,0 +1,32 @@
+"""
+File discovery for Better-DBT-Metrics
+Finds YAML files under a directory with os.scandir
+"""
+
+import os
+from pathlib import Path
+from typing import Iterator, Tuple, Union
+
+
+def iter_yaml_files(root: Union[str, Path], suffixes: Tuple[str, ...] = (".yml",)) -> Iterator[Path]:
+    """
+    Yield files under root whose names end with one of the suffixes.
+
+    Walks the same order as Path.rglob: each directory's files in scan
+    order, then its subdirectories depth first. Symlinked directories are
+    not followed. Only matching entries are turned into Path objects.
+    """
+    pending = [os.fspath(root)]
+    while pending:
+        directory = pending.pop()
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.endswith(suffixes):
+                        yield Path(entry.path)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+        pending.extend(reversed(subdirs))
@@ -3,12 +3,105 @@ Template System for Better-DBT-Metrics
 Handles metric templates, parameter validation, and template expansion
 """
 
+import ast
 import yaml
-from typing import Dict, List, Any, Optional, Set
+from copy import deepcopy
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from jinja2 import Template, Environment, meta
+from functools import lru_cache
 import re
 
+from features.file_discovery import iter_yaml_files
+
+
+# Matches a string that is nothing but a single "{{ name }}" placeholder
+_PURE_PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+# Top-level sections of a template file and the template type each defines
+_TEMPLATE_SECTIONS = {'metric_templates': 'metric', 'semantic_model_templates': 'semantic_model'}
+
+# libyaml's loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Jinja environment shared by every TemplateEngine that isn't given its own,
+# with custom filters for safe SQL handling
+_JINJA_ENV = Environment()
+_JINJA_ENV.filters['sql_quote'] = lambda x: f"'{x}'" if isinstance(x, str) else str(x)
+_JINJA_ENV.filters['safe_default'] = lambda x, d: x if x else d
+
+
+@lru_cache(maxsize=512)
+def _compile_template(template_str: str) -> Template:
+    """Compile a template string with the shared _JINJA_ENV"""
+    return _JINJA_ENV.from_string(template_str)
+
+
+def _scan_template_names(yaml_file: Path) -> Dict[str, List[str]]:
+    """
+    Read the template names a file defines, by template type, from its
+    parse events without constructing the document
+    """
+    names: Dict[str, List[str]] = {}
+    stack: List[List[bool]] = []  # [is_mapping, expecting_key] per open collection
+    section = None
+    
+    with open(yaml_file, 'rb') as f:
+        for event in yaml.parse(f, Loader=_YAML_LOADER):
+            if isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                stack.pop()
+                continue
+            if not isinstance(event, yaml.NodeEvent):
+                continue
+                
+            is_key = bool(stack) and stack[-1][0] and stack[-1][1]
+            if stack and stack[-1][0]:
+                stack[-1][1] = not stack[-1][1]
+                
+            if is_key and isinstance(event, yaml.ScalarEvent):
+                if len(stack) == 1:
+                    section = _TEMPLATE_SECTIONS.get(event.value)
+                elif len(stack) == 2 and section:
+                    names.setdefault(section, []).append(event.value)
+                    
+            if isinstance(event, yaml.MappingStartEvent):
+                stack.append([True, True])
+            elif isinstance(event, yaml.SequenceStartEvent):
+                stack.append([False, False])
+                
+    return names
+
+
+# Literal types that are safe to hand out from the _parse_literal cache as-is
+_IMMUTABLE_LITERALS = (str, int, float, complex, bool, bytes, type(None))
+
+
+@lru_cache(maxsize=1024)
+def _parse_literal(rendered: str) -> Any:
+    """Evaluate a rendered string as a Python literal, or return it unchanged"""
+    try:
+        # Only evaluate simple literals for safety
+        return ast.literal_eval(rendered)
+    except:
+        # Return as string if evaluation fails
+        return rendered
+
+
+@lru_cache(maxsize=512)
+def _pure_placeholder(template_str: str) -> Optional[str]:
+    """Return the parameter name if the string is a lone placeholder, else None"""
+    match = _PURE_PLACEHOLDER_RE.fullmatch(template_str)
+    return match.group(1) if match else None
+
+
+def clear_template_cache():
+    """Drop the compiled templates and parsed literals kept for the shared environment"""
+    _compile_template.cache_clear()
+    _parse_literal.cache_clear()
+    _pure_placeholder.cache_clear()
+
 
 @dataclass
 class TemplateParameter:
@@ -41,9 +134,17 @@ class TemplateEngine:
     - Default value handling
     """
     
-    def __init__(self):
+    def __init__(self, jinja_env: Optional[Environment] = None):
         self.templates: Dict[str, MetricTemplate] = {}
-        self.jinja_env = Environment()
+        
+        # Engines share the module environment and its compiled templates
+        # unless given their own environment
+        if jinja_env is None:
+            self.jinja_env = _JINJA_ENV
+            self._compile_template = _compile_template
+        else:
+            self.jinja_env = jinja_env
+            self._compile_template = lru_cache(maxsize=512)(jinja_env.from_string)
         
     def register_template(self, name: str, template_def: Dict[str, Any]):
         """Register a new metric template"""
@@ -99,7 +200,7 @@ class TemplateEngine:
             final_params.update(context)
             
         # Expand template
-        return self._expand_template_dict(template.template, final_params)
+        return self._render_template(template.template, final_params)
         
     def _prepare_parameters(self, template: MetricTemplate, 
                           provided_params: Dict[str, Any]) -> Dict[str, Any]:
@@ -156,68 +257,51 @@ class TemplateEngine:
             return isinstance(value, type_map[param_type])
         return True  # Unknown types pass validation
         
-    def _expand_template_dict(self, template_dict: Dict[str, Any], 
-                            params: Dict[str, Any]) -> Dict[str, Any]:
-        """Recursively expand a template dictionary"""
-        from copy import deepcopy
-        
-        # Deep copy to avoid modifying original
-        result = deepcopy(template_dict)
-        
-        # Process each value recursively without JSON conversion
-        self._process_dict_values(result, params)
-        
-        return result
-    
-    def _process_dict_values(self, obj: Dict[str, Any], params: Dict[str, Any]):
-        """Recursively process dictionary values with Jinja2 templates"""
-        for key, value in obj.items():
-            if isinstance(value, str):
-                # Check if it contains Jinja2 template syntax
-                if '{{' in value or '{%' in value:
-                    obj[key] = self._expand_string_template(value, params)
-            elif isinstance(value, dict):
-                self._process_dict_values(value, params)
-            elif isinstance(value, list):
-                self._process_list_values(value, params)
-    
-    def _process_list_values(self, obj: List[Any], params: Dict[str, Any]):
-        """Recursively process list values with Jinja2 templates"""
-        for i, item in enumerate(obj):
-            if isinstance(item, str):
-                if '{{' in item or '{%' in item:
-                    obj[i] = self._expand_string_template(item, params)
-            elif isinstance(item, dict):
-                self._process_dict_values(item, params)
-            elif isinstance(item, list):
-                self._process_list_values(item, params)
+    def _render_template(self, node: Any, params: Dict[str, Any]) -> Any:
+        """
+        Recursively expand a template node into fresh containers, leaving
+        the template itself untouched (scalar leaves are shared, not copied)
+        """
+        if isinstance(node, dict):
+            return {key: self._render_template(value, params) for key, value in node.items()}
+        if isinstance(node, list):
+            return [self._render_template(item, params) for item in node]
+        if isinstance(node, str) and ('{{' in node or '{%' in node):
+            # Contains Jinja2 template syntax
+            return self._expand_string_template(node, params)
+        return node
     
     def _expand_string_template(self, template_str: str, params: Dict[str, Any]) -> Any:
         """Expand a single template string"""
-        # Add custom filters for safe SQL handling
-        self.jinja_env.filters['sql_quote'] = lambda x: f"'{x}'" if isinstance(x, str) else str(x)
-        self.jinja_env.filters['safe_default'] = lambda x, d: x if x else d
-        
-        jinja_template = self.jinja_env.from_string(template_str)
-        result = jinja_template.render(**params)
+        # Fast path: "{{ name }}" is a plain parameter lookup, no Jinja needed
+        name = _pure_placeholder(template_str)
+        if name is not None and name in params:
+            return self._literal_or_string(str(params[name]))
+            
+        result = self._compile_template(template_str).render(**params)
         
         # Try to preserve the original type for pure template expressions
         if template_str.strip().startswith('{{') and template_str.strip().endswith('}}'):
             # This was a pure template expression, try to evaluate it
-            try:
-                import ast
-                # Only evaluate simple literals for safety
-                return ast.literal_eval(result)
-            except:
-                # Return as string if evaluation fails
-                pass
+            return self._literal_or_string(result)
         
         return result
+    
+    def _literal_or_string(self, rendered: str) -> Any:
+        """Evaluate a rendered expression as a Python literal, falling back to the string"""
+        value = _parse_literal(rendered)
+        if type(value) in _IMMUTABLE_LITERALS:
+            return value
+        # Containers are cached too, so hand each caller its own copy
+        return deepcopy(value)
         
 
 class TemplateLibrary:
     """
     Manages a library of templates loaded from files
+    
+    Template files are indexed by name on first use; a file's template
+    bodies are only loaded once one of its templates is expanded or inspected.
     """
     
     def __init__(self, template_dirs: List[str]):
@@ -225,59 +309,78 @@ class TemplateLibrary:
         self.engine = TemplateEngine()
         self.semantic_model_engine = TemplateEngine()  # Separate engine for semantic model templates
         self._loaded = False
+        self._manifest: Dict[Tuple[str, str], Path] = {}  # (template type, name) -> defining file
+        self._loaded_files: Set[Path] = set()
         
     def load_templates(self):
-        """Load all templates from configured directories"""
+        """Index all templates in the configured directories"""
         if self._loaded:
             return
             
         for template_dir in self.template_dirs:
-            self._load_directory(template_dir)
+            self._scan_directory(template_dir)
             
         self._loaded = True
         
-    def _load_directory(self, directory: str):
-        """Load templates from a directory"""
-        from pathlib import Path
-        
+    def _scan_directory(self, directory: str):
+        """Record which file defines each template in a directory"""
         dir_path = Path(directory)
         if not dir_path.exists():
             return
             
-        # Load all YAML files
-        for yaml_file in dir_path.rglob("*.yml"):
-            with open(yaml_file, 'r') as f:
-                data = yaml.safe_load(f)
-                
-            # Register metric templates
-            if 'metric_templates' in data:
-                for name, template_def in data['metric_templates'].items():
-                    self.engine.register_template(name, template_def)
+        for yaml_file in iter_yaml_files(dir_path):
+            for template_type, names in _scan_template_names(yaml_file).items():
+                for name in names:
+                    self._manifest[(template_type, name)] = yaml_file
                     
-            # Register semantic model templates
-            if 'semantic_model_templates' in data:
-                for name, template_def in data['semantic_model_templates'].items():
-                    self.semantic_model_engine.register_template(name, template_def)
+    def _load_file(self, yaml_file: Path):
+        """
+        Register the templates a file defines (those the manifest attributes
+        to it). Names registered since the library was indexed, such as
+        templates defined inline in a metrics file, take precedence and are
+        left alone, as they would be had the file been loaded up front.
+        """
+        from core.parser import load_yaml
+        
+        with open(yaml_file, 'r') as f:
+            data = load_yaml(f.read())
+            
+        for section, template_type in _TEMPLATE_SECTIONS.items():
+            engine = self._engine(template_type)
+            for name, template_def in (data.get(section) or {}).items():
+                if (self._manifest.get((template_type, str(name))) == yaml_file
+                        and name not in engine.templates):
+                    engine.register_template(name, template_def)
+                    
+        self._loaded_files.add(yaml_file)
+        
+    def _ensure_loaded(self, template_name: str, template_type: str):
+        """Load the file defining a template if it has not been loaded yet"""
+        self.load_templates()
+        yaml_file = self._manifest.get((template_type, template_name))
+        if yaml_file is not None and yaml_file not in self._loaded_files:
+            self._load_file(yaml_file)
+            
+    def _engine(self, template_type: str) -> TemplateEngine:
+        return self.semantic_model_engine if template_type == 'semantic_model' else self.engine
                     
     def expand(self, template_name: str, params: Dict[str, Any], template_type: str = 'metric') -> Dict[str, Any]:
         """Expand a template from the library"""
-        self.load_templates()  # Ensure loaded
-        if template_type == 'semantic_model':
-            return self.semantic_model_engine.expand_template(template_name, params)
-        return self.engine.expand_template(template_name, params)
+        self._ensure_loaded(template_name, template_type)
+        return self._engine(template_type).expand_template(template_name, params)
         
     def list_templates(self, template_type: str = 'metric') -> List[str]:
         """List all available templates"""
         self.load_templates()
-        if template_type == 'semantic_model':
-            return list(self.semantic_model_engine.templates.keys())
-        return list(self.engine.templates.keys())
+        names = [name for (kind, name) in self._manifest if kind == template_type]
+        registered = self._engine(template_type).templates
+        return list(dict.fromkeys(names + list(registered.keys())))
         
     def get_template_info(self, template_name: str, template_type: str = 'metric') -> Dict[str, Any]:
         """Get information about a template"""
-        self.load_templates()
+        self._ensure_loaded(template_name, template_type)
         
-        engine = self.semantic_model_engine if template_type == 'semantic_model' else self.engine
+        engine = self._engine(template_type)
         
         if template_name not in engine.templates:
             raise ValueError(f"Template '{template_name}' not found")
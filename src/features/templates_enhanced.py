@@ -6,8 +6,25 @@ Fixes formatting issues by avoiding JSON conversion
 import yaml
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
-from jinja2 import Environment, meta
+from jinja2 import Environment, Template, meta
 from copy import deepcopy
+from functools import lru_cache
+
+
+# Jinja environment shared by every YAMLSafeTemplateEngine; each engine adds
+# its custom filters to it
+_JINJA_ENV = Environment()
+
+
+@lru_cache(maxsize=512)
+def _compile_template(template_str: str) -> Template:
+    """Compile a template string with the shared environment, once per distinct string"""
+    return _JINJA_ENV.from_string(template_str)
+
+
+def clear_template_cache():
+    """Drop the templates compiled by the shared environment"""
+    _compile_template.cache_clear()
 
 
 class YAMLSafeTemplateEngine:
@@ -17,7 +34,7 @@ class YAMLSafeTemplateEngine:
     
     def __init__(self):
         self.templates: Dict[str, Dict[str, Any]] = {}
-        self.jinja_env = Environment()
+        self.jinja_env = _JINJA_ENV
         
         # Add custom filters for safe string handling
         self.jinja_env.filters['quote_sql'] = self._quote_sql
@@ -76,7 +93,7 @@ class YAMLSafeTemplateEngine:
     
     def _expand_string(self, template_str: str, params: Dict[str, Any]) -> Any:
         """Expand a single template string"""
-        jinja_template = self.jinja_env.from_string(template_str)
+        jinja_template = _compile_template(template_str)
         result = jinja_template.render(**params)
         
         # Try to preserve the original type
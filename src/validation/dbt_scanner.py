@@ -9,6 +9,13 @@ from typing import Set, Dict, List, Optional, Tuple
 import re
 
 
+# libyaml's loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Scanners filled by DBTProjectScanner.preload(), keyed by project directory
+_PRELOADED: Dict[Path, "DBTProjectScanner"] = {}
+
+
 class DBTProjectScanner:
     """Scans dbt project for available models, sources, and other resources"""
     
@@ -17,6 +24,29 @@ class DBTProjectScanner:
         self._models_cache: Optional[Set[str]] = None
         self._sources_cache: Optional[Dict[str, Set[str]]] = None
         
+    @classmethod
+    def for_project(cls, project_dir: str = ".") -> "DBTProjectScanner":
+        """The preloaded scanner for project_dir if there is one, else a new scanner"""
+        return _PRELOADED.get(Path(project_dir).resolve()) or cls(project_dir)
+        
+    @classmethod
+    def preload(cls, project_dir: str = ".") -> "DBTProjectScanner":
+        """
+        Scan project_dir now and share the result with every later
+        for_project() call in this process. Only preload a project that will
+        not change while the process runs, or clear_preloaded() after it does.
+        """
+        scanner = cls(project_dir)
+        scanner.get_available_models()
+        scanner.get_available_sources()
+        _PRELOADED[scanner.project_dir] = scanner
+        return scanner
+        
+    @staticmethod
+    def clear_preloaded():
+        """Forget every preloaded scan"""
+        _PRELOADED.clear()
+        
     def get_available_models(self) -> Set[str]:
         """Get all available dbt models"""
         if self._models_cache is not None:
@@ -185,7 +215,7 @@ class DBTProjectScanner:
                 
             try:
                 with open(yml_file) as f:
-                    data = yaml.safe_load(f)
+                    data = yaml.load(f, Loader=_YAML_LOADER)
                     
                 if not isinstance(data, dict):
                     continue
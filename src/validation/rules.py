@@ -10,6 +10,13 @@ import re
 from .types import ValidationResult, ValidationError
 
 
+# metric('name') / metric("name") references in expressions and filters
+_METRIC_REF_RE = re.compile(r"metric\s*\(\s*['\"]([^'\"]+)['\"]\s*\)")
+
+# ref('model') / ref("model") expressions
+_MODEL_REF_RE = re.compile(r"ref\s*\(\s*['\"]([^'\"]+)['\"]\s*\)")
+
+
 def is_templated_metric(metric: Dict[str, Any]) -> bool:
     """
     Check if a metric uses templates or references that need expansion.
@@ -229,38 +236,51 @@ class CircularDependencyRule(ValidationRule):
             if metric.get('type') == 'derived':
                 expr = metric.get('expression', metric.get('formula', ''))
                 # Extract metric references
-                refs = re.findall(r"metric\s*\(\s*['\"]([^'\"]+)['\"]\s*\)", expr)
+                refs = _METRIC_REF_RE.findall(expr)
                 deps.update(refs)
                 
             # Check filter references
             if 'filter' in metric:
-                refs = re.findall(r"metric\s*\(\s*['\"]([^'\"]+)['\"]\s*\)", metric['filter'])
+                refs = _METRIC_REF_RE.findall(metric['filter'])
                 deps.update(refs)
                 
             dependencies[name] = deps
             
-        # Check for cycles
-        def has_cycle(node: str, visited: Set[str], rec_stack: Set[str]) -> bool:
-            visited.add(node)
-            rec_stack.add(node)
+        # Check for cycles with an iterative depth-first search
+        visited: Set[str] = set()
+        
+        def find_cycle(root: str) -> Optional[List[str]]:
+            """Return the first dependency cycle reachable from root, if any"""
+            visited.add(root)
+            stack = [(root, iter(dependencies.get(root, ())))]
+            on_stack = {root}
             
-            for dep in dependencies.get(node, set()):
-                if dep not in visited:
-                    if has_cycle(dep, visited, rec_stack):
-                        return True
-                elif dep in rec_stack:
-                    return True
-                    
-            rec_stack.remove(node)
-            return False
+            while stack:
+                node, deps = stack[-1]
+                for dep in deps:
+                    if dep not in visited:
+                        visited.add(dep)
+                        on_stack.add(dep)
+                        stack.append((dep, iter(dependencies.get(dep, ()))))
+                        break
+                    if dep in on_stack:
+                        path = [name for name, _ in stack]
+                        return path[path.index(dep):] + [dep]
+                else:
+                    stack.pop()
+                    on_stack.discard(node)
+            return None
             
-        visited = set()
         for metric_name in dependencies:
             if metric_name not in visited:
-                if has_cycle(metric_name, visited, set()):
+                cycle = find_cycle(metric_name)
+                if cycle:
                     result.add_error(ValidationError(
                         file_path=str(file_path),
-                        message=f"Circular dependency detected involving metric '{metric_name}'",
+                        message=(
+                            f"Circular dependency detected involving metric '{metric_name}': "
+                            f"{' -> '.join(cycle)}"
+                        ),
                         suggestion="Review metric dependencies and remove circular references"
                     ))
                     
@@ -505,7 +525,7 @@ class MetricFilterReferencesRule(ValidationRule):
         for metric in data.get('metrics', []):
             if 'filter' in metric:
                 # Extract metric references
-                refs = re.findall(r"metric\s*\(\s*['\"]([^'\"]+)['\"]\s*\)", metric['filter'])
+                refs = _METRIC_REF_RE.findall(metric['filter'])
                 
                 for ref in refs:
                     if ref not in all_metrics:
@@ -536,7 +556,7 @@ class UniqueNamesRule(ValidationRule):
         metric_names = [m.get('name') for m in data.get('metrics', []) if m.get('name')]
         duplicates = self._find_duplicates(metric_names)
         
-        for name in duplicates:
+        for name in sorted(duplicates):
             result.add_error(ValidationError(
                 file_path=str(file_path),
                 message=f"Duplicate metric name '{name}' in file",
@@ -547,7 +567,7 @@ class UniqueNamesRule(ValidationRule):
         entity_names = [e.get('name') for e in data.get('entities', []) if e.get('name')]
         duplicates = self._find_duplicates(entity_names)
         
-        for name in duplicates:
+        for name in sorted(duplicates):
             result.add_error(ValidationError(
                 file_path=str(file_path),
                 message=f"Duplicate entity name '{name}' in file",
@@ -558,7 +578,7 @@ class UniqueNamesRule(ValidationRule):
         group_names = list(data.get('dimension_groups', {}).keys())
         duplicates = self._find_duplicates(group_names)
         
-        for name in duplicates:
+        for name in sorted(duplicates):
             result.add_error(ValidationError(
                 file_path=str(file_path),
                 message=f"Duplicate dimension group name '{name}' in file",
@@ -671,7 +691,7 @@ class ModelReferenceRule(ValidationRule):
             from .dbt_scanner import DBTProjectScanner
             # Use the base directory from the validator's parser
             base_dir = getattr(validator.parser, 'base_dir', Path('.'))
-            self.scanner = DBTProjectScanner(str(base_dir))
+            self.scanner = DBTProjectScanner.for_project(str(base_dir))
         
         # Check metrics for model references
         for metric in data.get('metrics', []):
@@ -740,8 +760,7 @@ class ModelReferenceRule(ValidationRule):
             return None
             
         # Match ref('model_name') or ref("model_name")
-        import re
-        match = re.search(r"ref\s*\(\s*['\"]([^'\"]+)['\"]\s*\)", model_ref)
+        match = _MODEL_REF_RE.search(model_ref)
         if match:
             return match.group(1)
         
@@ -2,11 +2,13 @@
 Main validator for Better-DBT-Metrics
 """
 
-from typing import Dict, List, Any, Optional, Set, Tuple
+from typing import Callable, Dict, List, Any, Mapping, Optional, Set, Tuple
 from pathlib import Path
+import re
 import yaml
 
 from core.parser import BetterDBTParser
+from features.file_discovery import iter_yaml_files
 from .types import ValidationError, ValidationResult
 from .rules import (
     RequiredFieldsRule,
@@ -25,6 +27,56 @@ from .rules import (
 )
 
 
+# libyaml's event parser when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Quoted names in messages, e.g. "Metric 'revenue' missing required field: type"
+_QUOTED_NAME_RE = re.compile(r"'([^']+)'")
+
+
+def _scan_metric_lines(file_path: Path) -> Dict[str, int]:
+    """
+    Map each metric name in a file to the 1-based line its definition starts
+    on, read from the parse events without constructing the document.
+    Raises yaml.MarkedYAMLError for malformed YAML.
+    """
+    lines: Dict[str, int] = {}
+    stack: List[List[bool]] = []  # [is_mapping, expecting_key] per open collection
+    in_metrics = False
+    metric_line = None
+    expecting_name = False
+    
+    with open(file_path, 'rb') as f:
+        for event in yaml.parse(f, Loader=_YAML_LOADER):
+            if isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                stack.pop()
+                continue
+            if not isinstance(event, yaml.NodeEvent):
+                continue
+                
+            is_key = bool(stack) and stack[-1][0] and stack[-1][1]
+            if stack and stack[-1][0]:
+                stack[-1][1] = not stack[-1][1]
+                
+            if len(stack) == 1 and is_key:
+                in_metrics = isinstance(event, yaml.ScalarEvent) and event.value == 'metrics'
+            elif len(stack) == 2 and in_metrics and isinstance(event, yaml.MappingStartEvent):
+                metric_line = event.start_mark.line + 1
+            elif len(stack) == 3 and in_metrics and isinstance(event, yaml.ScalarEvent):
+                if expecting_name:
+                    lines.setdefault(event.value, metric_line)
+                expecting_name = is_key and event.value == 'name'
+            elif len(stack) == 3:
+                expecting_name = False
+                
+            if isinstance(event, yaml.MappingStartEvent):
+                stack.append([True, True])
+            elif isinstance(event, yaml.SequenceStartEvent):
+                stack.append([False, False])
+                
+    return lines
+
+
 class MetricsValidator:
     """
     Main validator that orchestrates all validation rules
@@ -54,13 +106,38 @@ class MetricsValidator:
         # Cache for parsed data
         self.parsed_cache: Dict[str, Any] = {}
         
+    def reset(self):
+        """
+        Forget previously validated files so the validator can be reused.
+        The rules, including any cached dbt project scan, are kept.
+        """
+        self.parsed_cache = {}
+        self.parser.imports_cache.clear()
+        self.parser.import_stack.clear()
+        self.parser.current_file = None
+        self.parser.current_data = {}
+        
     def validate_file(self, file_path: Path) -> ValidationResult:
         """Validate a single metrics file"""
+        result = self._validate_document(file_path, lambda: self.parser.parse_file(file_path))
+        self._add_line_numbers(result, file_path)
+        return result
+        
+    def validate_source(self, text: str, source_name: str) -> ValidationResult:
+        """Validate metrics YAML text as if it had been read from source_name"""
+        return self._validate_document(Path(source_name), lambda: self.parser.parse_string(text, source_name))
+        
+    def validate_data(self, data: Dict[str, Any], source_name: str) -> ValidationResult:
+        """Validate an already-loaded metrics document as if it had been read from source_name"""
+        return self._validate_document(Path(source_name), lambda: self.parser.parse_data(data, source_name))
+        
+    def _validate_document(self, file_path: Path, parse: Callable[[], Dict[str, Any]]) -> ValidationResult:
+        """Parse one document with parse() and run every rule over it"""
         result = ValidationResult()
         
         try:
             # Parse the file
-            parsed_data = self.parser.parse_file(file_path)
+            parsed_data = parse()
             self.parsed_cache[str(file_path)] = parsed_data
             
             # Add basic info
@@ -88,6 +165,36 @@ class MetricsValidator:
             
         return result
         
+    def _add_line_numbers(self, result: ValidationResult, file_path: Path):
+        """
+        Fill in line numbers for this file's errors and warnings. Only files
+        with problems are rescanned, so clean files pay nothing extra.
+        """
+        unlocated = [
+            e for e in result.errors + result.warnings
+            if e.file_path == str(file_path) and e.line_number is None
+        ]
+        if not unlocated:
+            return
+            
+        try:
+            metric_lines = _scan_metric_lines(file_path)
+        except yaml.MarkedYAMLError as e:
+            # Syntax errors point at where the parser gave up
+            mark = e.problem_mark or e.context_mark
+            if mark is not None:
+                for error in unlocated:
+                    error.line_number = mark.line + 1
+            return
+        except (OSError, yaml.YAMLError):
+            return
+            
+        for error in unlocated:
+            for name in _QUOTED_NAME_RE.findall(error.message):
+                if name in metric_lines:
+                    error.line_number = metric_lines[name]
+                    break
+        
     def validate_directory(self, directory: str, fix: bool = False) -> ValidationResult:
         """Validate all metrics files in a directory"""
         result = ValidationResult()
@@ -100,7 +207,7 @@ class MetricsValidator:
             return result
             
         # Find all YAML files
-        yaml_files = list(dir_path.rglob("*.yml")) + list(dir_path.rglob("*.yaml"))
+        yaml_files = list(iter_yaml_files(dir_path, (".yml", ".yaml")))
         
         if not yaml_files:
             result.add_warning(ValidationError(
@@ -118,8 +225,46 @@ class MetricsValidator:
                 
             file_result = self.validate_file(file_path)
             result.merge(file_result)
+            
+        self._check_duplicates_across_files(result)
+        return result
+        
+    def validate_sources(self, sources: Mapping[str, str]) -> ValidationResult:
+        """
+        Validate in-memory metrics YAML, keyed by the file name each text
+        stands in for, with the same checks as validate_directory
+        """
+        return self._validate_all(sources, self.validate_source)
+        
+    def validate_documents(self, documents: Mapping[str, Dict[str, Any]]) -> ValidationResult:
+        """Like validate_sources, for documents that are already loaded"""
+        return self._validate_all(documents, self.validate_data)
         
-        # Cross-file validation - check for duplicate metric names
+    def _validate_all(self, sources: Mapping[str, Any],
+                      validate_one: Callable[[Any, str], ValidationResult]) -> ValidationResult:
+        """Validate each named source with validate_one, then check across them"""
+        result = ValidationResult()
+        
+        if not sources:
+            result.add_warning(ValidationError(
+                message="No YAML sources to validate"
+            ))
+            return result
+            
+        result.info.append(f"Found {len(sources)} YAML sources to validate")
+        
+        for source_name, source in sources.items():
+            # Skip files starting with underscore
+            if Path(source_name).name.startswith('_'):
+                continue
+                
+            result.merge(validate_one(source, source_name))
+            
+        self._check_duplicates_across_files(result)
+        return result
+        
+    def _check_duplicates_across_files(self, result: ValidationResult):
+        """Report metric names defined in more than one validated file"""
         metric_to_files = {}
         for file_path, data in self.parsed_cache.items():
             for metric in data.get('metrics', []):
@@ -136,8 +281,6 @@ class MetricsValidator:
                     message=f"Metric '{metric_name}' defined in multiple files: {', '.join(files)}",
                     suggestion="Use unique metric names across all files"
                 ))
-            
-        return result
         
     def get_all_metrics(self) -> List[Dict[str, Any]]:
         """Get all metrics from parsed files"""
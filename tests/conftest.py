@@ -0,0 +1,131 @@
+"""Shared pytest fixtures
+
+Heavy dependencies (yaml, the compiler) are imported inside the fixtures
+that need them so that collecting test modules stays cheap.
+
+The suite is safe to run with pytest-xdist (``pytest -n auto``): tests only
+write under tmp_path / tmp_path_factory, and module-scoped shared objects
+are built separately in each worker process.
+
+Each process does keep some caches that outlive a test, and results can
+depend on what earlier tests in the same worker left in them:
+
+- ``core.compiler._COMPILE_CACHE``: compilations made with ``cache=True``
+  (``BetterDBTCompiler.clear_compile_cache()``)
+- ``core.parser._yaml_snapshot``: parsed YAML texts
+  (``BetterDBTCompiler.clear_yaml_cache()``)
+- ``features.templates._compile_template`` and its literal caches
+  (``features.templates.clear_template_cache()``)
+- ``features.templates_enhanced._compile_template``
+  (``features.templates_enhanced.clear_template_cache()``)
+- ``validation.dbt_scanner._PRELOADED``: dbt project scans filled by the
+  session ``_warmup`` fixture (``DBTProjectScanner.clear_preloaded()``)
+
+Modules imported under the ``src.`` prefix are separate copies with caches
+of their own. Tests that need a cold process use the ``clear_caches``
+fixture, which empties both copies.
+"""
+
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warmup():
+    """Scan the dbt project the compile tests validate against once per session"""
+    from src.core.compiler import BetterDBTCompiler
+    BetterDBTCompiler.warmup()
+
+
+@pytest.fixture
+def clear_caches(monkeypatch):
+    """Start the test with every process-wide cache empty
+    
+    Both copies of each module (``core.compiler`` and ``src.core.compiler``,
+    and so on) are cleared, whichever of them have been imported. The
+    preloaded dbt project scans are swapped for an empty registry only for
+    this test, so later tests keep the session's warm scan.
+    """
+    import sys
+    
+    for prefix in ("", "src."):
+        modules = {name: sys.modules.get(prefix + name) for name in (
+            "core.compiler", "core.parser", "features.templates",
+            "features.templates_enhanced", "validation.dbt_scanner"
+        )}
+        if modules["core.compiler"]:
+            modules["core.compiler"].BetterDBTCompiler.clear_compile_cache()
+        if modules["core.parser"]:
+            modules["core.parser"].clear_yaml_cache()
+        for name in ("features.templates", "features.templates_enhanced"):
+            if modules[name]:
+                modules[name].clear_template_cache()
+        if modules["validation.dbt_scanner"]:
+            monkeypatch.setattr(modules["validation.dbt_scanner"], "_PRELOADED", {})
+
+
+@pytest.fixture(scope="session")
+def load_yaml():
+    """Return a function that loads a YAML file from disk
+    
+    Keys and short strings are interned, since the same handful of names
+    (``type``, ``day``, ``primary``...) recur throughout compiled output.
+    """
+    import yaml
+    from tests.helpers import intern_strings
+    Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    
+    def _load(path: Path):
+        with open(path, 'r') as f:
+            return intern_strings(yaml.load(f, Loader=Loader))
+    
+    return _load
+
+
+@pytest.fixture(scope="session")
+def fixture_dir(tmp_path_factory):
+    """Return a function that stores a YAML fixture and returns its directory
+    
+    Directories are content-addressed and made once per session, so tests
+    that compile the same file share an input directory and, with
+    ``cache=True``, the compiler's cached result. Tests must not write to them.
+    """
+    import hashlib
+    root = tmp_path_factory.mktemp("fixtures")
+    
+    def _dir(name: str, text: str) -> Path:
+        directory = root / hashlib.sha1(f"{name}\n{text}".encode()).hexdigest()
+        if not directory.exists():
+            directory.mkdir()
+            (directory / name).write_text(text)
+        return directory
+    
+    return _dir
+
+
+@pytest.fixture(scope="session")
+def make_compiler():
+    """Return a factory that builds a compiler from CompilerConfig keyword arguments"""
+    from src.core.compiler import BetterDBTCompiler, CompilerConfig
+    
+    def _make(**config):
+        return BetterDBTCompiler(CompilerConfig(**config))
+    
+    return _make
+
+
+@pytest.fixture
+def compiler_options():
+    """Extra CompilerConfig options for the compiler fixture; override in a test module"""
+    return {}
+
+
+@pytest.fixture
+def compiler(make_compiler, tmp_path, compiler_options):
+    """A fresh compiler reading from and writing under this test's tmp_path"""
+    return make_compiler(
+        input_dir=str(tmp_path),
+        output_dir=str(tmp_path / "output"),
+        debug=True,
+        **compiler_options
+    )
@@ -0,0 +1,62 @@
+"""Plain helper functions shared by the test modules"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+
+def by_name(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Index a list of named dicts (metrics, models, measures) by name"""
+    return {item['name']: item for item in items}
+
+
+def find_by_fragment(named: Dict[str, Dict[str, Any]], fragment: str) -> Dict[str, Any]:
+    """The first item of a by-name index whose name contains fragment"""
+    return named[next(name for name in named if fragment in name)]
+
+
+def materialize(root: Path, files: Dict[str, Union[str, bytes]]) -> None:
+    """Write {relative path: content} files under root, creating parent directories"""
+    made = set()
+    for rel_path, content in files.items():
+        path = root / rel_path
+        if path.parent not in made:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            made.add(path.parent)
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content)
+
+
+def link_tree(src: Path, dst: Path) -> None:
+    """Hardlink every file under src into dst (a copytree for fixtures tests only read)"""
+    dst.mkdir(parents=True, exist_ok=True)
+    with os.scandir(src) as entries:
+        for entry in entries:
+            target = dst / entry.name
+            if entry.is_dir(follow_symlinks=False):
+                link_tree(Path(entry.path), target)
+            else:
+                os.link(entry.path, target)
+
+
+def intern_strings(obj: Any, max_len: int = 32) -> Any:
+    """Intern dict keys and short string values in a loaded YAML tree"""
+    if isinstance(obj, dict):
+        return {
+            (sys.intern(k) if isinstance(k, str) else k): intern_strings(v, max_len)
+            for k, v in obj.items()
+        }
+    if isinstance(obj, list):
+        return [intern_strings(item, max_len) for item in obj]
+    if isinstance(obj, str) and len(obj) <= max_len:
+        return sys.intern(obj)
+    return obj
+
+
+def assert_contains_all(haystack: str, *needles: str) -> None:
+    """Assert that every needle is a substring of haystack"""
+    missing = [n for n in needles if n not in haystack]
+    assert not missing, f"{missing} not found in {haystack!r}"
@@ -3,8 +3,6 @@
 import pytest
 import yaml
 from pathlib import Path
-import tempfile
-import shutil
 
 from core.compiler import BetterDBTCompiler, CompilerConfig
 
@@ -13,11 +11,9 @@ class TestAutoInferenceConfig:
     """Test auto-inference with bdm_config.yml configuration"""
     
     @pytest.fixture
-    def temp_dir(self):
-        """Create a temporary directory for test files"""
-        temp_dir = tempfile.mkdtemp()
-        yield temp_dir
-        shutil.rmtree(temp_dir)
+    def temp_dir(self, tmp_path):
+        """Temporary directory for test files"""
+        return tmp_path
     
     def test_global_auto_inference_config(self, temp_dir):
         """Test that auto-inference uses patterns from bdm_config.yml"""
@@ -83,7 +79,7 @@ semantic_models:
         assert compiler.bdm_config.auto_inference['categorical_patterns']['max_cardinality'] == 50
         
         # Compile
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # The auto-inference should use the custom patterns
         # (actual inference would happen if we had schema access)
@@ -129,7 +125,7 @@ semantic_models:
         assert compiler.auto_inference.config.enabled is False
         
         # Compile
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Auto-inference should not run even though it's requested
     
@@ -211,7 +207,7 @@ semantic_models:
         compiler = BetterDBTCompiler(config)
         
         # Compile
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # The explicit dimension should be preserved
         # Auto-inference would add more dimensions if schema was available
\ No newline at end of file
@@ -3,25 +3,25 @@
 import pytest
 import yaml
 from pathlib import Path
-import tempfile
-import shutil
+import sys
 
 from core.compiler import BetterDBTCompiler, CompilerConfig
+from tests.helpers import by_name, find_by_fragment, materialize
+
+# libyaml's loader when PyYAML was built with it
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 
 class TestCompiler:
     """Test the BetterDBTCompiler functionality"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _env(self, tmp_path):
         """Setup test fixtures"""
-        self.temp_dir = tempfile.mkdtemp()
-        self.output_dir = Path(self.temp_dir) / "output"
+        self.temp_dir = str(tmp_path)
+        self.output_dir = tmp_path / "output"
         self.output_dir.mkdir()
         
-    def teardown_method(self):
-        """Cleanup temp files"""
-        shutil.rmtree(self.temp_dir)
-        
     def create_test_file(self, filename, content):
         """Helper to create test files"""
         file_path = Path(self.temp_dir) / filename
@@ -64,7 +64,7 @@ metrics:
         assert output_file.exists()
         
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         assert 'metrics' in output
         assert len(output['metrics']) == 1
@@ -102,12 +102,12 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        results = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         # Verify ratio metric structure - find the ratio metric by name
         ratio_metric = None
@@ -232,12 +232,12 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        results = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         metric = output['metrics'][0]
         assert metric['type'] == 'derived'
@@ -274,12 +274,12 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        results = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         metric = output['metrics'][0]
         assert metric['type'] == 'cumulative'
@@ -321,12 +321,12 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        results = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         metric = output['metrics'][0]
         assert metric['type'] == 'conversion'
@@ -370,26 +370,24 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        results = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         # Check measures in semantic models
-        all_measures = []
-        for model in output['semantic_models']:
-            all_measures.extend(model.get('measures', []))
+        measures = by_name([m for model in output['semantic_models'] for m in model.get('measures', [])])
             
         # Verify measure types
-        measure_types = {m['agg'] for m in all_measures}
+        measure_types = {m['agg'] for m in measures.values()}
         assert 'median' in measure_types
         assert 'percentile' in measure_types
         assert 'stddev' in measure_types
         
         # Check percentile parameters
-        p95_measure = next(m for m in all_measures if 'p95' in m['name'])
+        p95_measure = find_by_fragment(measures, 'p95')
         assert 'agg_params' in p95_measure
         assert p95_measure['agg_params']['percentile'] == 0.95
         
@@ -425,12 +423,12 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        results = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         # Check entities in semantic models
         for model in output['semantic_models']:
@@ -480,12 +478,12 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        results = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         # Check dimensions in semantic model
         model = output['semantic_models'][0]
@@ -526,10 +524,324 @@ metrics:
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         metric_names = [m['name'] for m in output['metrics']]
         assert 'revenue' in metric_names
         assert 'revenue_wow' in metric_names
         assert 'revenue_mom' in metric_names
-        assert 'revenue_by_region' in metric_names
\ No newline at end of file
+        assert 'revenue_by_region' in metric_names
+        
+    def test_reset_clears_compilation_state(self):
+        """Test that reset() lets one compiler run again from a clean slate"""
+        content = """
+version: 2
+metric_templates:
+  sum_template:
+    parameters:
+      - name: column
+        required: true
+    template:
+      type: simple
+      source: fct_orders
+      measure:
+        type: sum
+        column: "{{ column }}"
+metrics:
+  - name: revenue
+    template: sum_template
+    parameters:
+      column: amount
+"""
+        # Keep the output out of the input directory so the rerun does not compile it
+        metrics_dir = Path(self.temp_dir) / "metrics"
+        metrics_dir.mkdir()
+        (metrics_dir / "metrics.yml").write_text(content)
+        
+        config = CompilerConfig(
+            input_dir=str(metrics_dir),
+            output_dir=str(self.output_dir),
+            split_files=False,
+            validate=False
+        )
+        compiler = BetterDBTCompiler(config)
+        compiler.compile_directory()
+        assert compiler.compiled_metrics
+        assert 'sum_template' in compiler.templates.engine.templates
+        
+        compiler.reset()
+        
+        assert compiler.compiled_metrics == []
+        assert compiler.semantic_models == []
+        assert compiler.metrics_by_source == {}
+        assert 'sum_template' not in compiler.templates.engine.templates
+        
+        # A second run produces the same result as the first
+        results = compiler.compile_directory()
+        assert results['metrics_compiled'] == 1
+        
+    def test_compile_sources(self):
+        """Test that in-memory YAML compiles the same as the files it stands in for"""
+        content = """
+version: 2
+metrics:
+  - name: total_revenue
+    type: simple
+    source: fct_orders
+    measure:
+      type: sum
+      column: revenue
+"""
+        self.create_test_file("metrics.yml", content)
+        
+        def make_compiler(input_dir):
+            return BetterDBTCompiler(CompilerConfig(
+                input_dir=input_dir,
+                output_dir=str(self.output_dir),
+                validate=False,
+                emit_files=False
+            ))
+            
+        from_files = make_compiler(self.temp_dir)
+        from_files.compile_directory()
+        
+        empty_dir = Path(self.temp_dir) / "empty"
+        empty_dir.mkdir()
+        from_sources = make_compiler(str(empty_dir))
+        results = from_sources.compile_sources({
+            "metrics.yml": content,
+            "_ignored.yml": "not: [valid"
+        })
+        
+        assert results['files_processed'] == 1
+        assert results['errors'] == []
+        assert from_sources.compiled_output == from_files.compiled_output
+        assert list(from_sources.compiled_metrics_by_name) == ['total_revenue']
+        
+        # Loaded documents compile the same way and are left untouched
+        data = yaml.load(content, Loader=Loader)
+        from_data = make_compiler(str(empty_dir))
+        from_data.compile_parsed({"metrics.yml": data})
+        assert data == yaml.load(content, Loader=Loader)
+        assert from_data.compiled_output == from_files.compiled_output
+        
+    def test_compile_cache(self):
+        """Test that a cached compile is reused until an input file changes"""
+        metrics_dir = Path(self.temp_dir) / "metrics"
+        metrics_dir.mkdir()
+        metrics_file = metrics_dir / "metrics.yml"
+        metrics_file.write_text("""
+version: 2
+metrics:
+  - name: cached_revenue
+    type: simple
+    source: fct_orders
+    measure:
+      type: sum
+      column: amount
+""")
+        
+        def compile_once():
+            config = CompilerConfig(
+                input_dir=str(metrics_dir),
+                output_dir=str(self.output_dir),
+                split_files=False,
+                validate=False,
+                cache=True
+            )
+            compiler = BetterDBTCompiler(config)
+            return compiler, compiler.compile_directory()
+        
+        first, first_results = compile_once()
+        second, second_results = compile_once()
+        
+        assert second_results == first_results
+        assert second.compiled_output == first.compiled_output
+        assert [m['name'] for m in second.compiled_metrics] == ['cached_revenue']
+        
+        # Name indexes point at the restored objects on a cache hit
+        assert second.compiled_metrics_by_name['cached_revenue'] is second.compiled_metrics[0]
+        assert second.compiled_metrics[0]['name'] is sys.intern('cached_revenue')
+        assert second.semantic_models_by_name.keys() == {sm['name'] for sm in second.semantic_models}
+        assert second.measures_by_name.keys() == {
+            m['name'] for sm in second.semantic_models for m in sm['measures']
+        }
+        
+        # The cached copy is not shared with the compiler that produced it
+        second.compiled_metrics.clear()
+        assert first.compiled_metrics
+        
+        # Changing an input file invalidates the cache
+        metrics_file.write_text(metrics_file.read_text().replace('cached_revenue', 'renamed_revenue'))
+        third, _ = compile_once()
+        assert [m['name'] for m in third.compiled_metrics] == ['renamed_revenue']
+        
+    def test_compile_cache_tracks_bdm_config(self, monkeypatch):
+        """Test that changing bdm_config.yml in the working directory invalidates the cache"""
+        metrics_dir = Path(self.temp_dir) / "metrics"
+        materialize(metrics_dir, {"models.yml": """
+version: 2
+semantic_models:
+  - name: orders
+    source: orders
+    auto_infer:
+      dimensions: true
+"""})
+        # Outside the input directory, so only the resolved settings can change the key
+        monkeypatch.chdir(self.temp_dir)
+        bdm_config = Path(self.temp_dir) / "bdm_config.yml"
+        
+        def compile_with(enabled):
+            bdm_config.write_text(f"auto_inference:\n  enabled: {enabled}\n")
+            compiler = BetterDBTCompiler(CompilerConfig(
+                input_dir=str(metrics_dir),
+                output_dir=str(self.output_dir),
+                validate=False,
+                emit_files=False,
+                cache=True
+            ))
+            compiler.compile_directory(return_summary=False)
+            return compiler.semantic_models_by_name['sem_orders']
+            
+        assert compile_with('true').get('dimensions')
+        assert not compile_with('false').get('dimensions')
+        
+    def test_compile_cache_hit_still_validates(self, monkeypatch):
+        """Test that a cached compile is not served when validation now fails"""
+        metrics_dir = Path(self.temp_dir) / "metrics"
+        metrics_dir.mkdir()
+        (metrics_dir / "metrics.yml").write_text("""
+version: 2
+metrics:
+  - name: unvalidated_revenue
+    type: simple
+    source: fct_missing_model
+    measure:
+      type: sum
+      column: amount
+""")
+        
+        def compile_once():
+            compiler = BetterDBTCompiler(CompilerConfig(
+                input_dir=str(metrics_dir),
+                output_dir=str(self.output_dir),
+                validate=True,
+                cache=True
+            ))
+            return compiler.compile_directory()
+            
+        # Seed the cache as if the dbt project had the model at the time
+        with monkeypatch.context() as patched:
+            patched.setattr(BetterDBTCompiler, "_check_validation", lambda self, result: None)
+            compile_once()
+            
+        with pytest.raises(ValueError, match="validation errors"):
+            compile_once()
+        
+    def test_compile_cache_on_disk(self, monkeypatch, clear_caches):
+        """Test that cached compiles persist in cache_dir across processes"""
+        metrics_dir = Path(self.temp_dir) / "metrics"
+        metrics_dir.mkdir()
+        (metrics_dir / "metrics.yml").write_text("""
+version: 2
+metrics:
+  - name: persisted_revenue
+    type: simple
+    source: fct_orders
+    measure:
+      type: sum
+      column: amount
+""")
+        cache_dir = Path(self.temp_dir) / "cache"
+        
+        def compile_once():
+            compiler = BetterDBTCompiler(CompilerConfig(
+                input_dir=str(metrics_dir),
+                output_dir=str(self.output_dir),
+                validate=False,
+                cache=True,
+                cache_dir=str(cache_dir)
+            ))
+            return compiler, compiler.compile_directory()
+            
+        # clear_caches starts from an empty in-process cache, as a new test run would
+        first, first_results = compile_once()
+        assert len(list(cache_dir.glob("*.marshal"))) == 1
+        
+        BetterDBTCompiler.clear_compile_cache()
+        monkeypatch.setattr(BetterDBTCompiler, "compile_file", lambda self, path: pytest.fail("recompiled"))
+        second, second_results = compile_once()
+        
+        assert second_results == first_results
+        assert second.compiled_output == first.compiled_output
+        assert list(second.compiled_metrics_by_name) == ['persisted_revenue']
+        
+    def test_inline_template_overrides_library(self):
+        """Test that an inline template wins over a library template of the same name"""
+        library_dir = Path(self.temp_dir) / "templates"
+        metrics_dir = Path(self.temp_dir) / "metrics"
+        library_template = """
+metric_templates:
+  {name}:
+    template:
+      type: simple
+      source: {source}
+      measure:
+        type: count
+        column: id
+"""
+        materialize(library_dir, {
+            "a_lib1.yml": library_template.format(name="U", source="lib_u_source"),
+            "b_lib2.yml": library_template.format(name="T", source="lib_t_source"),
+        })
+        materialize(metrics_dir, {
+            "t1.yml": """
+version: 2
+metric_templates:
+  T:
+    template:
+      type: simple
+      source: inline_source
+      measure:
+        type: count
+        column: id
+metrics:
+  - name: m_t
+    template: T
+""",
+            "u1.yml": """
+version: 2
+metrics:
+  - name: m_u
+    template: U
+""",
+        })
+        
+        compiler = BetterDBTCompiler(CompilerConfig(
+            input_dir=str(metrics_dir),
+            output_dir=str(self.output_dir),
+            template_dirs=[str(library_dir)],
+            validate=False,
+            emit_files=False
+        ))
+        compiler.compile_directory(return_summary=False)
+        
+        assert compiler.compiled_metrics_by_name['m_t']['source'] == 'inline_source'
+        assert compiler.compiled_metrics_by_name['m_u']['source'] == 'lib_u_source'
+        
+    def test_json_output_rejects_unknown_types(self):
+        """Test that JSON output converts dates and sets and raises on other types"""
+        import io
+        from datetime import date
+        
+        compiler = BetterDBTCompiler(CompilerConfig(
+            input_dir=self.temp_dir,
+            output_dir=str(self.output_dir),
+            output_format='json'
+        ))
+        stream = io.StringIO()
+        compiler._dump_output({'start': date(2024, 1, 31), 'tags': {'b', 'a'}}, stream)
+        assert yaml.safe_load(stream.getvalue()) == {'start': '2024-01-31', 'tags': ['a', 'b']}
+        
+        with pytest.raises(TypeError):
+            compiler._dump_output({'path': Path(self.temp_dir)}, io.StringIO())
@@ -4,9 +4,6 @@ Tests for entity relationships in semantic models
 
 import pytest
 import yaml
-from pathlib import Path
-import tempfile
-import shutil
 
 from src.core.compiler import BetterDBTCompiler, CompilerConfig
 
@@ -14,16 +11,12 @@ from src.core.compiler import BetterDBTCompiler, CompilerConfig
 class TestEntityRelationships:
     """Test primary/foreign key relationships in semantic models"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _env(self, tmp_path):
         """Set up test fixtures"""
-        self.test_dir = tempfile.mkdtemp()
-        self.metrics_dir = Path(self.test_dir) / "metrics"
-        self.metrics_dir.mkdir(parents=True)
-        self.output_dir = Path(self.test_dir) / "output"
-        
-    def teardown_method(self):
-        """Clean up test fixtures"""
-        shutil.rmtree(self.test_dir)
+        self.metrics_dir = tmp_path / "metrics"
+        self.metrics_dir.mkdir()
+        self.output_dir = tmp_path / "output"
         
     def test_basic_entity_definition(self):
         """Test basic entity definition with relationships"""
@@ -63,7 +56,7 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check that entities were registered
         assert 'customer' in compiler.entities
@@ -130,7 +123,7 @@ semantic_models:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check entity set was registered
         assert 'customer_orders' in compiler.entity_sets
@@ -188,11 +181,11 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check semantic model has explicit entities
         assert len(compiler.semantic_models) >= 1
-        semantic_model = next(sm for sm in compiler.semantic_models if sm['name'] == 'sem_product_performance')
+        semantic_model = compiler.semantic_models_by_name['sem_product_performance']
         
         entities = semantic_model['entities']
         assert len(entities) == 3
@@ -258,7 +251,7 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check semantic model includes all related entities
         semantic_model = compiler.semantic_models[0]
@@ -296,7 +289,7 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check that entities were inferred
         semantic_model = compiler.semantic_models[0]
@@ -339,10 +332,10 @@ metrics:
             validate=False
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check metric was compiled correctly
-        metric = next(m for m in compiler.compiled_metrics if m['name'] == 'signup_to_purchase')
+        metric = compiler.compiled_metrics_by_name['signup_to_purchase']
         assert metric['type'] == 'conversion'
         assert metric.get('entity') == 'user'
         
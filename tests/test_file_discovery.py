@@ -0,0 +1,22 @@
+"""Tests for YAML file discovery"""
+
+from features.file_discovery import iter_yaml_files
+from tests.helpers import materialize
+
+
+def test_iter_yaml_files_matches_rglob(tmp_path):
+    """Test that discovery finds the same files, in the same order, as Path.rglob"""
+    materialize(tmp_path, {
+        "a.yml": "",
+        "model.sql": "",
+        "nested/b.yml": "",
+        "nested/c.yaml": "",
+        "nested/deeper/d.yml": "",
+        "other/e.yml": "",
+    })
+    
+    assert list(iter_yaml_files(tmp_path)) == list(tmp_path.rglob("*.yml"))
+    assert set(iter_yaml_files(tmp_path, (".yml", ".yaml"))) == (
+        set(tmp_path.rglob("*.yml")) | set(tmp_path.rglob("*.yaml"))
+    )
+    assert list(iter_yaml_files(tmp_path / "missing")) == []
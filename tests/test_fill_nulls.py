@@ -2,29 +2,25 @@
 
 import pytest
 import yaml
-from pathlib import Path
-import tempfile
-import shutil
 
 from core.compiler import BetterDBTCompiler, CompilerConfig
 
+# libyaml's loader when PyYAML was built with it
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 class TestFillNulls:
     """Test fill nulls functionality for time series metrics"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _env(self, tmp_path):
         """Setup test fixtures"""
-        self.temp_dir = tempfile.mkdtemp()
-        self.metrics_dir = Path(self.temp_dir) / "metrics"
-        self.output_dir = Path(self.temp_dir) / "output"
+        self.metrics_dir = tmp_path / "metrics"
+        self.output_dir = tmp_path / "output"
         
         self.metrics_dir.mkdir()
         self.output_dir.mkdir()
         
-    def teardown_method(self):
-        """Cleanup temp files"""
-        shutil.rmtree(self.temp_dir)
-        
     def test_fill_nulls_with_zero(self):
         """Test filling nulls with zero"""
         
@@ -69,7 +65,7 @@ metrics:
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         # Find the metric
         metric = output['metrics'][0]
@@ -126,7 +122,7 @@ metrics:
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         # Find the metric
         metric = output['metrics'][0]
@@ -228,7 +224,7 @@ metrics:
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         # Find the metric
         metric = output['metrics'][0]
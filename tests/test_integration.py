@@ -2,31 +2,28 @@
 
 import pytest
 import yaml
-from pathlib import Path
-import tempfile
-import shutil
 
 from core.compiler import BetterDBTCompiler, CompilerConfig
+from tests.helpers import by_name, find_by_fragment
+
+# libyaml's loader when PyYAML was built with it
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 
 class TestIntegration:
     """Test the full integration of all components"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _env(self, tmp_path):
         """Setup test fixtures"""
-        self.temp_dir = tempfile.mkdtemp()
-        self.templates_dir = Path(self.temp_dir) / "templates"
-        self.metrics_dir = Path(self.temp_dir) / "metrics"
-        self.output_dir = Path(self.temp_dir) / "output"
+        self.templates_dir = tmp_path / "templates"
+        self.metrics_dir = tmp_path / "metrics"
+        self.output_dir = tmp_path / "output"
         
         self.templates_dir.mkdir()
         self.metrics_dir.mkdir()
         self.output_dir.mkdir()
         
-    def teardown_method(self):
-        """Cleanup temp files"""
-        shutil.rmtree(self.temp_dir)
-        
     def test_full_compilation_with_imports_and_templates(self):
         """Test a complete compilation with imports, templates, and dimension groups"""
         
@@ -240,7 +237,7 @@ metrics:
         assert output_file.exists()
         
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         # Verify metrics
         assert 'metrics' in output
@@ -286,19 +283,14 @@ metrics:
         assert 'channel' in dim_names
         
         # Verify advanced measure types
-        all_measures = []
-        for model in output['semantic_models']:
-            all_measures.extend(model.get('measures', []))
+        measures = by_name([m for model in output['semantic_models'] for m in model.get('measures', [])])
             
-        measure_types = {m['agg'] for m in all_measures}
+        measure_types = {m['agg'] for m in measures.values()}
         assert 'median' in measure_types
         assert 'percentile' in measure_types
         
         # Check percentile configuration
-        p90_measure = next(
-            m for m in all_measures 
-            if 'p90' in m['name']
-        )
+        p90_measure = find_by_fragment(measures, 'p90')
         assert p90_measure['agg_params']['percentile'] == 0.90
         
     def test_error_handling(self):
@@ -4,9 +4,6 @@ Tests for join path configuration
 
 import pytest
 import yaml
-from pathlib import Path
-import tempfile
-import shutil
 
 from src.core.compiler import BetterDBTCompiler, CompilerConfig
 
@@ -14,16 +11,12 @@ from src.core.compiler import BetterDBTCompiler, CompilerConfig
 class TestJoinPaths:
     """Test join path configuration functionality"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _env(self, tmp_path):
         """Set up test fixtures"""
-        self.test_dir = tempfile.mkdtemp()
-        self.metrics_dir = Path(self.test_dir) / "metrics"
-        self.metrics_dir.mkdir(parents=True)
-        self.output_dir = Path(self.test_dir) / "output"
-        
-    def teardown_method(self):
-        """Clean up test fixtures"""
-        shutil.rmtree(self.test_dir)
+        self.metrics_dir = tmp_path / "metrics"
+        self.metrics_dir.mkdir()
+        self.output_dir = tmp_path / "output"
         
     def test_basic_join_path(self):
         """Test basic join path definition"""
@@ -57,7 +50,7 @@ metrics:
             output_dir=str(self.output_dir)
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check join paths were registered
         assert len(compiler.join_paths) == 1
@@ -114,7 +107,7 @@ metrics:
             output_dir=str(self.output_dir)
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check multi-hop join was processed
         assert len(compiler.join_paths) == 1
@@ -162,7 +155,7 @@ metrics:
             output_dir=str(self.output_dir)
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check join conditions are included
         semantic_model = compiler.semantic_models[0]
@@ -212,7 +205,7 @@ metrics:
             output_dir=str(self.output_dir)
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check join path alias was registered
         assert 'customer_full' in compiler.join_path_aliases
@@ -263,10 +256,10 @@ metrics:
             output_dir=str(self.output_dir)
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check semantic model has explicit joins
-        semantic_model = next(sm for sm in compiler.semantic_models if sm['name'] == 'sales_analysis')
+        semantic_model = compiler.semantic_models_by_name['sales_analysis']
         assert 'joins' in semantic_model
         assert len(semantic_model['joins']) == 2
         
@@ -309,7 +302,7 @@ metrics:
             output_dir=str(self.output_dir)
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check semantic model doesn't have unnecessary joins
         semantic_model = compiler.semantic_models[0]
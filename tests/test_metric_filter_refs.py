@@ -2,29 +2,26 @@
 
 import pytest
 import yaml
-from pathlib import Path
-import tempfile
-import shutil
 
 from core.compiler import BetterDBTCompiler, CompilerConfig
+from tests.helpers import by_name
+
+# libyaml's loader when PyYAML was built with it
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 
 class TestMetricFilterReferences:
     """Test metric references in filter expressions"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _env(self, tmp_path):
         """Setup test fixtures"""
-        self.temp_dir = tempfile.mkdtemp()
-        self.metrics_dir = Path(self.temp_dir) / "metrics"
-        self.output_dir = Path(self.temp_dir) / "output"
+        self.metrics_dir = tmp_path / "metrics"
+        self.output_dir = tmp_path / "output"
         
         self.metrics_dir.mkdir()
         self.output_dir.mkdir()
         
-    def teardown_method(self):
-        """Cleanup temp files"""
-        shutil.rmtree(self.temp_dir)
-        
     def test_simple_metric_reference_in_filter(self):
         """Test a simple metric reference in a filter"""
         
@@ -73,7 +70,7 @@ metrics:
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         # Find the high_value_orders metric
         metrics = {m['name']: m for m in output['metrics']}
@@ -237,17 +234,14 @@ metrics:
         # Check output
         output_file = self.output_dir / "compiled_semantic_models.yml"
         with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+            output = yaml.load(f, Loader=Loader)
             
         # Check that the measure filter references were extracted
         semantic_models = {m['name']: m for m in output['semantic_models']}
         trans_model = semantic_models['sem_fct_transactions']
         
         # Find the measure with the filter
-        above_threshold_measure = next(
-            m for m in trans_model['measures'] 
-            if m['name'] == 'above_threshold_sum_measure'
-        )
+        above_threshold_measure = by_name(trans_model['measures'])['above_threshold_sum_measure']
         
         assert 'agg_params' in above_threshold_measure
         assert 'where' in above_threshold_measure['agg_params']
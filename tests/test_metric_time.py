@@ -4,9 +4,6 @@ Tests for metric_time dimension support
 
 import pytest
 import yaml
-from pathlib import Path
-import tempfile
-import shutil
 
 from src.core.compiler import BetterDBTCompiler, CompilerConfig
 
@@ -14,21 +11,15 @@ from src.core.compiler import BetterDBTCompiler, CompilerConfig
 class TestMetricTime:
     """Test metric_time dimension functionality"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _env(self, tmp_path, fixture_dir):
         """Set up test fixtures"""
-        self.test_dir = tempfile.mkdtemp()
-        self.metrics_dir = Path(self.test_dir) / "metrics"
-        self.metrics_dir.mkdir(parents=True)
-        self.output_dir = Path(self.test_dir) / "output"
-        
-    def teardown_method(self):
-        """Clean up test fixtures"""
-        shutil.rmtree(self.test_dir)
+        self.fixture_dir = fixture_dir
+        self.output_dir = tmp_path / "output"
         
     def test_basic_metric_time(self):
         """Test basic metric_time dimension"""
-        metrics_file = self.metrics_dir / "test_metric_time.yml"
-        metrics_file.write_text("""
+        metrics_dir = self.fixture_dir("test_metric_time.yml", """
 version: 2
 
 metrics:
@@ -46,11 +37,12 @@ metrics:
 """)
         
         config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
+            input_dir=str(metrics_dir),
+            output_dir=str(self.output_dir),
+            cache=True
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check metric was compiled with metric_time
         metric = compiler.compiled_metrics[0]
@@ -69,8 +61,7 @@ metrics:
         
     def test_metric_time_different_grains(self):
         """Test metric_time with different grains"""
-        metrics_file = self.metrics_dir / "test_metric_time_grains.yml"
-        metrics_file.write_text("""
+        metrics_dir = self.fixture_dir("test_metric_time_grains.yml", """
 version: 2
 
 metrics:
@@ -100,26 +91,26 @@ metrics:
 """)
         
         config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
+            input_dir=str(metrics_dir),
+            output_dir=str(self.output_dir),
+            cache=True
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check first metric has month grain
-        monthly_metric = next(m for m in compiler.compiled_metrics if m['name'] == 'monthly_revenue')
+        monthly_metric = compiler.compiled_metrics_by_name['monthly_revenue']
         mt_dim = next(d for d in monthly_metric['dimensions'] if d['name'] == 'metric_time')
         assert mt_dim['grain'] == 'month'
         
         # Check second metric has week grain
-        weekly_metric = next(m for m in compiler.compiled_metrics if m['name'] == 'weekly_orders')
+        weekly_metric = compiler.compiled_metrics_by_name['weekly_orders']
         mt_dim = next(d for d in weekly_metric['dimensions'] if d['name'] == 'metric_time')
         assert mt_dim['grain'] == 'week'
         
     def test_metric_time_in_ratio_metrics(self):
         """Test metric_time in ratio metrics"""
-        metrics_file = self.metrics_dir / "test_metric_time_ratio.yml"
-        metrics_file.write_text("""
+        metrics_dir = self.fixture_dir("test_metric_time_ratio.yml", """
 version: 2
 
 metrics:
@@ -148,14 +139,15 @@ metrics:
 """)
         
         config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
+            input_dir=str(metrics_dir),
+            output_dir=str(self.output_dir),
+            cache=True
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check metric was compiled
-        metric = next(m for m in compiler.compiled_metrics if m['name'] == 'conversion_rate')
+        metric = compiler.compiled_metrics_by_name['conversion_rate']
         assert metric['type'] == 'ratio'
         
         # Check numerator has metric_time
@@ -168,8 +160,7 @@ metrics:
         
     def test_multiple_time_dimensions_with_metric_time(self):
         """Test metrics with both metric_time and other time dimensions"""
-        metrics_file = self.metrics_dir / "test_multiple_time_dims.yml"
-        metrics_file.write_text("""
+        metrics_dir = self.fixture_dir("test_multiple_time_dims.yml", """
 version: 2
 
 metrics:
@@ -193,11 +184,12 @@ metrics:
 """)
         
         config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
+            input_dir=str(metrics_dir),
+            output_dir=str(self.output_dir),
+            cache=True
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check all dimensions are present
         metric = compiler.compiled_metrics[0]
@@ -215,8 +207,7 @@ metrics:
         
     def test_semantic_model_with_primary_time_dimension(self):
         """Test explicit semantic model with primary_time_dimension"""
-        metrics_file = self.metrics_dir / "test_primary_time.yml"
-        metrics_file.write_text("""
+        metrics_dir = self.fixture_dir("test_primary_time.yml", """
 version: 2
 
 semantic_models:
@@ -245,14 +236,15 @@ metrics:
 """)
         
         config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
+            input_dir=str(metrics_dir),
+            output_dir=str(self.output_dir),
+            cache=True
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check semantic model has primary_time_dimension
-        semantic_model = next(sm for sm in compiler.semantic_models if sm['name'] == 'unified_metrics')
+        semantic_model = compiler.semantic_models_by_name['unified_metrics']
         assert semantic_model.get('primary_time_dimension') == 'metric_time'
         
         # Check dimensions are properly defined
@@ -262,8 +254,7 @@ metrics:
         
     def test_cumulative_metric_with_metric_time(self):
         """Test cumulative metrics with metric_time"""
-        metrics_file = self.metrics_dir / "test_cumulative_metric_time.yml"
-        metrics_file.write_text("""
+        metrics_dir = self.fixture_dir("test_cumulative_metric_time.yml", """
 version: 2
 
 metrics:
@@ -283,11 +274,12 @@ metrics:
 """)
         
         config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
+            input_dir=str(metrics_dir),
+            output_dir=str(self.output_dir),
+            cache=True
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check cumulative metric has metric_time
         metric = compiler.compiled_metrics[0]
@@ -298,8 +290,7 @@ metrics:
         
     def test_metric_time_without_expr(self):
         """Test metric_time without explicit expression"""
-        metrics_file = self.metrics_dir / "test_metric_time_no_expr.yml"
-        metrics_file.write_text("""
+        metrics_dir = self.fixture_dir("test_metric_time_no_expr.yml", """
 version: 2
 
 metrics:
@@ -317,11 +308,12 @@ metrics:
 """)
         
         config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
+            input_dir=str(metrics_dir),
+            output_dir=str(self.output_dir),
+            cache=True
         )
         compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        compiler.compile_directory(return_summary=False)
         
         # Check metric_time dimension exists
         metric = compiler.compiled_metrics[0]
@@ -3,32 +3,13 @@ Tests for offset windows in cumulative metrics
 """
 
 import pytest
-import yaml
 from pathlib import Path
-import tempfile
-import shutil
+from textwrap import dedent
 
-from src.core.compiler import BetterDBTCompiler, CompilerConfig
+from tests.helpers import by_name
 
-
-class TestOffsetWindows:
-    """Test offset window support in cumulative metrics"""
-    
-    def setup_method(self):
-        """Set up test fixtures"""
-        self.test_dir = tempfile.mkdtemp()
-        self.metrics_dir = Path(self.test_dir) / "metrics"
-        self.metrics_dir.mkdir(parents=True)
-        self.output_dir = Path(self.test_dir) / "output"
-        
-    def teardown_method(self):
-        """Clean up test fixtures"""
-        shutil.rmtree(self.test_dir)
-        
-    def test_basic_offset_window(self):
-        """Test basic offset window in cumulative metric"""
-        metrics_file = self.metrics_dir / "test_offset.yml"
-        metrics_file.write_text("""
+# Fixture YAML, normalized once at import time
+_BASIC_OFFSET_YAML = dedent("""
 version: 2
 
 metrics:
@@ -48,41 +29,9 @@ metrics:
       - name: order_date
         type: time
         grain: day
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir),
-            validate=False,
-            split_files=False
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check offset was compiled
-        metric = next(m for m in compiler.compiled_metrics if m['name'] == 'revenue_mtd_with_offset')
-        assert metric['type'] == 'cumulative'
-        
-        # Check dbt metric has offset configuration
-        output_file = self.output_dir / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            import yaml
-            output = yaml.safe_load(f)
-            
-        dbt_metric = next(m for m in output['metrics'] if m['name'] == 'revenue_mtd_with_offset')
-        cumulative_params = dbt_metric['type_params']['cumulative_type_params']
-        assert 'offset_windows' in cumulative_params
-        assert len(cumulative_params['offset_windows']) == 1
-        
-        offset = cumulative_params['offset_windows'][0]
-        assert offset['period'] == 'month'
-        assert offset['offset'] == -1
-        assert offset['alias'] == 'last_month_mtd'
-        
-    def test_multiple_offsets(self):
-        """Test multiple offset windows"""
-        metrics_file = self.metrics_dir / "test_multiple_offsets.yml"
-        metrics_file.write_text("""
+""").strip().encode()
+
+_MULTIPLE_OFFSETS_YAML = dedent("""
 version: 2
 
 metrics:
@@ -108,36 +57,9 @@ metrics:
       - name: activity_date
         type: time
         grain: day
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir),
-            validate=False,
-            split_files=False
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check all offsets were compiled
-        output_file = self.output_dir / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            import yaml
-            output = yaml.safe_load(f)
-            
-        dbt_metric = next(m for m in output['metrics'] if m['name'] == 'cumulative_users_comparisons')
-        offsets = dbt_metric['type_params']['cumulative_type_params']['offset_windows']
-        assert len(offsets) == 3
-        
-        # Check each offset
-        assert offsets[0]['alias'] == 'week_ago'
-        assert offsets[1]['alias'] == 'month_ago'
-        assert offsets[2]['alias'] == 'year_ago'
-        
-    def test_offset_with_calculations(self):
-        """Test offset window with calculations"""
-        metrics_file = self.metrics_dir / "test_calculations.yml"
-        metrics_file.write_text("""
+""").strip().encode()
+
+_CALCULATIONS_YAML = dedent("""
 version: 2
 
 metrics:
@@ -162,34 +84,9 @@ metrics:
       - name: activity_date
         type: time
         grain: day
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir),
-            validate=False,
-            split_files=False
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check calculations were compiled
-        output_file = self.output_dir / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            import yaml
-            output = yaml.safe_load(f)
-            
-        dbt_metric = next(m for m in output['metrics'] if m['name'] == 'weekly_active_users_growth')
-        offset = dbt_metric['type_params']['cumulative_type_params']['offset_windows'][0]
-        assert 'calculations' in offset
-        assert len(offset['calculations']) == 2
-        assert offset['calculations'][0]['type'] == 'difference'
-        assert offset['calculations'][1]['type'] == 'percent_change'
-        
-    def test_offset_with_filter_inheritance(self):
-        """Test offset window with filter inheritance"""
-        metrics_file = self.metrics_dir / "test_filter_inherit.yml"
-        metrics_file.write_text("""
+""").strip().encode()
+
+_FILTER_INHERIT_YAML = dedent("""
 version: 2
 
 metrics:
@@ -216,32 +113,9 @@ metrics:
       - name: order_date
         type: time
         grain: day
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir),
-            validate=False,
-            split_files=False
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check filter inheritance settings
-        output_file = self.output_dir / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            import yaml
-            output = yaml.safe_load(f)
-            
-        dbt_metric = next(m for m in output['metrics'] if m['name'] == 'premium_revenue_offset')
-        offsets = dbt_metric['type_params']['cumulative_type_params']['offset_windows']
-        assert offsets[0]['inherit_filters'] == True
-        assert offsets[1]['inherit_filters'] == False
-        
-    def test_offset_pattern(self):
-        """Test using offset patterns"""
-        metrics_file = self.metrics_dir / "test_pattern.yml"
-        metrics_file.write_text("""
+""").strip().encode()
+
+_OFFSET_PATTERN_YAML = dedent("""
 version: 2
 
 offset_window_config:
@@ -271,34 +145,9 @@ metrics:
       - name: order_date
         type: time
         grain: day
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir),
-            validate=False,
-            split_files=False
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check pattern was expanded
-        output_file = self.output_dir / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            import yaml
-            output = yaml.safe_load(f)
-            
-        dbt_metric = next(m for m in output['metrics'] if m['name'] == 'revenue_with_pattern')
-        offsets = dbt_metric['type_params']['cumulative_type_params']['offset_windows']
-        assert len(offsets) == 3
-        assert offsets[0]['alias'] == 'last_week'
-        assert offsets[1]['alias'] == 'last_month'
-        assert offsets[2]['alias'] == 'last_year'
-        
-    def test_window_type_trailing(self):
-        """Test trailing window type"""
-        metrics_file = self.metrics_dir / "test_trailing.yml"
-        metrics_file.write_text("""
+""").strip().encode()
+
+_TRAILING_YAML = dedent("""
 version: 2
 
 metrics:
@@ -319,32 +168,9 @@ metrics:
       - name: order_date
         type: time
         grain: day
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir),
-            validate=False,
-            split_files=False
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check window type was set
-        output_file = self.output_dir / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            import yaml
-            output = yaml.safe_load(f)
-            
-        dbt_metric = next(m for m in output['metrics'] if m['name'] == 'trailing_30d_revenue')
-        cumulative_params = dbt_metric['type_params']['cumulative_type_params']
-        assert cumulative_params['window_type'] == 'trailing'
-        assert cumulative_params['window'] == 30
-        
-    def test_fiscal_period_offset(self):
-        """Test fiscal period offset"""
-        metrics_file = self.metrics_dir / "test_fiscal.yml"
-        metrics_file.write_text("""
+""").strip().encode()
+
+_FISCAL_YAML = dedent("""
 version: 2
 
 time_spine:
@@ -374,57 +200,9 @@ metrics:
       - name: fiscal_date
         type: time
         grain: day
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir),
-            validate=False,
-            split_files=False
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check fiscal offset
-        output_file = self.output_dir / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            import yaml
-            output = yaml.safe_load(f)
-            
-        dbt_metric = next(m for m in output['metrics'] if m['name'] == 'fiscal_ytd_offset')
-        offset = dbt_metric['type_params']['cumulative_type_params']['offset_windows'][0]
-        assert offset['period'] == 'fiscal_year'
-        
-    def test_validation_error_non_cumulative(self):
-        """Test validation error for offsets on non-cumulative metric"""
-        metrics_file = self.metrics_dir / "test_invalid.yml"
-        metrics_file.write_text("""
-version: 2
+""").strip().encode()
 
-metrics:
-  - name: simple_with_offset
-    type: simple
-    source: fct_orders
-    measure:
-      type: sum
-      column: revenue
-    offsets:
-      - period: month
-        offset: -1
-        alias: invalid
-""")
-        
-        from src.validation.validator import MetricsValidator
-        validator = MetricsValidator(str(self.test_dir))
-        result = validator.validate_file(metrics_file)
-        
-        assert not result.is_valid
-        assert any("Non-cumulative metric" in e.message for e in result.errors)
-        
-    def test_complex_calculation_expression(self):
-        """Test offset with complex calculation expression"""
-        metrics_file = self.metrics_dir / "test_complex_calc.yml"
-        metrics_file.write_text("""
+_COMPLEX_CALC_YAML = dedent("""
 version: 2
 
 metrics:
@@ -447,25 +225,179 @@ metrics:
       - name: order_date
         type: time
         grain: day
-""")
+""").strip().encode()
+
+_INVALID_OFFSET_YAML = dedent("""
+version: 2
+
+metrics:
+  - name: simple_with_offset
+    type: simple
+    source: fct_orders
+    measure:
+      type: sum
+      column: revenue
+    offsets:
+      - period: month
+        offset: -1
+        alias: invalid
+""").strip().encode()
+
+# Fixture files compiled together by the class-scoped ``compiled`` fixture
+ALL_FIXTURES = [
+    ("test_offset", _BASIC_OFFSET_YAML),
+    ("test_multiple_offsets", _MULTIPLE_OFFSETS_YAML),
+    ("test_calculations", _CALCULATIONS_YAML),
+    ("test_filter_inherit", _FILTER_INHERIT_YAML),
+    ("test_pattern", _OFFSET_PATTERN_YAML),
+    ("test_trailing", _TRAILING_YAML),
+    ("test_fiscal", _FISCAL_YAML),
+    ("test_complex_calc", _COMPLEX_CALC_YAML),
+]
+
+
+@pytest.fixture(scope="module")
+def workspace(tmp_path_factory):
+    """Create a temporary directory shared by the whole module"""
+    return tmp_path_factory.mktemp("offset_windows")
+
+
+@pytest.fixture(scope="module")
+def compiled(workspace, make_compiler):
+    """Compile every fixture file in a single run"""
+    metrics_dir = workspace / "metrics"
+    metrics_dir.mkdir()
+    for name, content in ALL_FIXTURES:
+        (metrics_dir / f"{name}.yml").write_bytes(content)
+
+    compiler = make_compiler(
+        input_dir=str(metrics_dir),
+        output_dir=str(workspace / "output"),
+        validate=False,
+        split_files=False,
+        output_format="json",
+        cache=True
+    )
+    compiler.compile_directory(return_summary=False)
+    return compiler
+
+
+@pytest.fixture(scope="module")
+def output(compiled, load_yaml):
+    """Load the compiled dbt output once for the module"""
+    return load_yaml(Path(compiled.config.output_dir) / "compiled_semantic_models.yml")
+
+
+@pytest.fixture(scope="module")
+def dbt_metrics(output):
+    """Compiled dbt metrics indexed by name"""
+    return by_name(output['metrics'])
+
+
+class TestOffsetWindows:
+    """Test offset window support in cumulative metrics"""
+    
+    def test_basic_offset_window(self, compiled, dbt_metrics):
+        """Test basic offset window in cumulative metric"""
+        # Check offset was compiled
+        metric = by_name(compiled.compiled_metrics)['revenue_mtd_with_offset']
+        assert metric['type'] == 'cumulative'
         
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir),
-            validate=False,
-            split_files=False
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
+        # Check dbt metric has offset configuration
+        dbt_metric = dbt_metrics['revenue_mtd_with_offset']
+        cumulative_params = dbt_metric['type_params']['cumulative_type_params']
+        assert 'offset_windows' in cumulative_params
+        offsets = cumulative_params['offset_windows']
+        assert len(offsets) == 1
         
+        offset = offsets[0]
+        assert offset['period'] == 'month'
+        assert offset['offset'] == -1
+        assert offset['alias'] == 'last_month_mtd'
+        
+    def test_multiple_offsets(self, dbt_metrics):
+        """Test multiple offset windows"""
+        # Check all offsets were compiled
+        dbt_metric = dbt_metrics['cumulative_users_comparisons']
+        offsets = dbt_metric['type_params']['cumulative_type_params']['offset_windows']
+        assert len(offsets) == 3
+        
+        # Check each offset
+        assert {o['alias'] for o in offsets} == {'week_ago', 'month_ago', 'year_ago'}
+        
+    def test_offset_with_calculations(self, dbt_metrics):
+        """Test offset window with calculations"""
+        # Check calculations were compiled
+        dbt_metric = dbt_metrics['weekly_active_users_growth']
+        offset = dbt_metric['type_params']['cumulative_type_params']['offset_windows'][0]
+        assert 'calculations' in offset
+        calculations = offset['calculations']
+        assert len(calculations) == 2
+        assert calculations[0]['type'] == 'difference'
+        assert calculations[1]['type'] == 'percent_change'
+        
+    def test_offset_with_filter_inheritance(self, dbt_metrics):
+        """Test offset window with filter inheritance"""
+        # Check filter inheritance settings
+        dbt_metric = dbt_metrics['premium_revenue_offset']
+        offsets = dbt_metric['type_params']['cumulative_type_params']['offset_windows']
+        inherit_filters = {o['alias']: o['inherit_filters'] for o in offsets}
+        assert inherit_filters == {'last_month_premium': True, 'last_month_all': False}
+        
+    def test_offset_pattern(self, dbt_metrics):
+        """Test using offset patterns"""
+        # Check pattern was expanded
+        dbt_metric = dbt_metrics['revenue_with_pattern']
+        offsets = dbt_metric['type_params']['cumulative_type_params']['offset_windows']
+        assert len(offsets) == 3
+        assert {o['alias'] for o in offsets} == {'last_week', 'last_month', 'last_year'}
+        
+    def test_window_type_trailing(self, dbt_metrics):
+        """Test trailing window type"""
+        # Check window type was set
+        dbt_metric = dbt_metrics['trailing_30d_revenue']
+        cumulative_params = dbt_metric['type_params']['cumulative_type_params']
+        assert cumulative_params['window_type'] == 'trailing'
+        assert cumulative_params['window'] == 30
+        
+    def test_fiscal_period_offset(self, dbt_metrics):
+        """Test fiscal period offset"""
+        # Check fiscal offset
+        dbt_metric = dbt_metrics['fiscal_ytd_offset']
+        offset = dbt_metric['type_params']['cumulative_type_params']['offset_windows'][0]
+        assert offset['period'] == 'fiscal_year'
+        
+    def test_validation_error_non_cumulative(self, tmp_path):
+        """Test validation error for offsets on non-cumulative metric"""
+        metrics_file = tmp_path / "test_invalid.yml"
+        metrics_file.write_bytes(_INVALID_OFFSET_YAML)
+        
+        from src.validation.validator import MetricsValidator
+        validator = MetricsValidator(str(tmp_path))
+        result = validator.validate_file(metrics_file)
+        
+        assert not result.is_valid
+        assert any("Non-cumulative metric" in e.message for e in result.errors)
+        
+    def test_complex_calculation_expression(self, dbt_metrics):
+        """Test offset with complex calculation expression"""
         # Check calculation expression
-        output_file = self.output_dir / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            import yaml
-            output = yaml.safe_load(f)
-            
-        dbt_metric = next(m for m in output['metrics'] if m['name'] == 'qtd_revenue_yoy')
+        dbt_metric = dbt_metrics['qtd_revenue_yoy']
         offset = dbt_metric['type_params']['cumulative_type_params']['offset_windows'][0]
         assert 'calculation' in offset
         assert 'calculation_alias' in offset
-        assert offset['calculation_alias'] == 'yoy_growth_percent'
\ No newline at end of file
+        assert offset['calculation_alias'] == 'yoy_growth_percent'
+        
+    def test_json_output_matches_yaml(self, compiled, output, tmp_path, make_compiler, load_yaml):
+        """Test that JSON output loads to the same data as YAML output"""
+        compiler = make_compiler(
+            input_dir=compiled.config.input_dir,
+            output_dir=str(tmp_path / "output"),
+            validate=False,
+            split_files=False,
+            cache=True  # Same inputs as the compiled fixture
+        )
+        assert compiler.compile_directory(return_summary=False) is None
+        
+        yaml_output = load_yaml(tmp_path / "output" / "compiled_semantic_models.yml")
+        assert yaml_output == output
@@ -3,7 +3,6 @@
 import pytest
 import yaml
 from pathlib import Path
-import tempfile
 import os
 
 from core.parser import BetterDBTParser
@@ -12,15 +11,11 @@ from core.parser import BetterDBTParser
 class TestParser:
     """Test the BetterDBTParser functionality"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _env(self, tmp_path):
         """Setup test fixtures"""
         self.parser = BetterDBTParser()
-        self.temp_dir = tempfile.mkdtemp()
-        
-    def teardown_method(self):
-        """Cleanup temp files"""
-        import shutil
-        shutil.rmtree(self.temp_dir)
+        self.temp_dir = str(tmp_path)
         
     def test_simple_parse(self):
         """Test parsing a simple metrics file"""
@@ -126,4 +121,65 @@ metrics:
         with pytest.raises(Exception) as exc_info:
             self.parser.parse_file(str(file_a))
             
-        assert "Circular import" in str(exc_info.value)
\ No newline at end of file
+        assert "Circular import" in str(exc_info.value)
+        
+    def test_base_dir_reassignment(self):
+        """Test that a parser can be pointed at a new base directory"""
+        file_path = Path(self.temp_dir) / "test.yml"
+        with open(file_path, 'w') as f:
+            f.write("version: 2\nmetrics:\n  - name: relocated_metric\n")
+            
+        self.parser.imports_cache['stale'] = {}
+        self.parser.base_dir = self.temp_dir
+        
+        assert self.parser.base_dir == Path(self.temp_dir)
+        assert self.parser.imports_cache == {}
+        
+        # Relative paths now resolve against the new base directory
+        result = self.parser.parse_file("test.yml")
+        assert result['metrics'][0]['name'] == 'relocated_metric'
+        
+    def test_parse_string(self):
+        """Test parsing YAML text without a file on disk"""
+        imported_path = Path(self.temp_dir) / "imported.yml"
+        with open(imported_path, 'w') as f:
+            f.write("dimension_groups:\n  test_group:\n    dimensions:\n      - name: test_dim\n")
+            
+        self.parser.base_dir = self.temp_dir
+        result = self.parser.parse_string("""
+imports:
+  - imported.yml as imp
+metrics:
+  - name: in_memory_metric
+    source: ref('fct_orders')
+""")
+        
+        assert result['metrics'][0]['name'] == 'in_memory_metric'
+        assert result['metrics'][0]['source'] == 'fct_orders'
+        assert 'imp' in self.parser.imports_cache
+        
+        with pytest.raises(ValueError):
+            self.parser.parse_string("- not\n- a\n- dict\n")
+        
+    def test_keys_are_interned(self):
+        """Test that parsed mapping keys are interned strings"""
+        import sys
+        
+        result = self.parser.parse_string("metrics:\n  - name: interned_metric\n")
+        key = next(iter(result['metrics'][0]))
+        assert key is sys.intern('name')
+        
+    def test_repeated_text_returns_fresh_objects(self):
+        """Test that a cached parse hands out a new copy each time"""
+        import sys
+        import datetime
+        
+        text = "metrics:\n  - name: cached_metric\n    meta:\n      added: 2024-01-31\n"
+        first = self.parser.parse_string(text)
+        second = self.parser.parse_string(text)
+        
+        assert first == second
+        assert first['metrics'][0]['meta']['added'] == datetime.date(2024, 1, 31)
+        first['metrics'][0]['name'] = 'changed'
+        assert second['metrics'][0]['name'] == 'cached_metric'
+        assert next(iter(second['metrics'][0])) is sys.intern('name')
@@ -1,35 +1,19 @@
 """Tests specifically for ratio metric template expansion fix"""
 
 import pytest
-import yaml
-from pathlib import Path
-import tempfile
-import shutil
-
-from core.compiler import BetterDBTCompiler, CompilerConfig
 
 
 class TestRatioTemplateExpansion:
     """Test that ratio metrics work correctly with template expansion"""
     
-    def setup_method(self):
-        """Setup test fixtures"""
-        self.temp_dir = tempfile.mkdtemp()
-        self.output_dir = Path(self.temp_dir) / "output"
-        self.output_dir.mkdir()
-        
-    def teardown_method(self):
-        """Cleanup temp files"""
-        shutil.rmtree(self.temp_dir)
-        
-    def create_test_file(self, filename, content):
+    def create_test_file(self, temp_dir, filename, content):
         """Helper to create test files"""
-        file_path = Path(self.temp_dir) / filename
+        file_path = temp_dir / filename
         with open(file_path, 'w') as f:
             f.write(content)
         return file_path
         
-    def test_ratio_template_with_different_sources(self):
+    def test_ratio_template_with_different_sources(self, tmp_path, make_compiler, load_yaml):
         """Test ratio metric template expansion with different sources"""
         content = """
 version: 1
@@ -69,15 +53,14 @@ metrics:
         type: time
         grain: day
 """
-        self.create_test_file("ratio_template.yml", content)
+        self.create_test_file(tmp_path, "ratio_template.yml", content)
         
-        config = CompilerConfig(
-            input_dir=self.temp_dir,
-            output_dir=str(self.output_dir),
+        compiler = make_compiler(
+            input_dir=str(tmp_path),
+            output_dir=str(tmp_path / "output"),
             split_files=False,
             validate=False
         )
-        compiler = BetterDBTCompiler(config)
         results = compiler.compile_directory()
         
         # Should compile successfully
@@ -85,9 +68,7 @@ metrics:
         assert results['metrics_compiled'] == 1
         
         # Check output
-        output_file = self.output_dir / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+        output = load_yaml(tmp_path / "output" / "compiled_semantic_models.yml")
             
         # Verify metric was compiled correctly
         metric = output['metrics'][0]
@@ -99,7 +80,7 @@ metrics:
         assert 'numerator' in metric['type_params']
         assert 'denominator' in metric['type_params']
         
-    def test_ratio_template_with_same_source(self):
+    def test_ratio_template_with_same_source(self, tmp_path, make_compiler, load_yaml):
         """Test ratio metric template expansion with same source"""
         content = """
 version: 1
@@ -140,15 +121,14 @@ metrics:
       - name: channel
         type: categorical
 """
-        self.create_test_file("conversion_template.yml", content)
+        self.create_test_file(tmp_path, "conversion_template.yml", content)
         
-        config = CompilerConfig(
-            input_dir=self.temp_dir,
-            output_dir=str(self.output_dir),
+        compiler = make_compiler(
+            input_dir=str(tmp_path),
+            output_dir=str(tmp_path / "output"),
             split_files=False,
             validate=False
         )
-        compiler = BetterDBTCompiler(config)
         results = compiler.compile_directory()
         
         # Should compile successfully
@@ -156,15 +136,13 @@ metrics:
         assert results['metrics_compiled'] == 1
         
         # Check that the source was correctly auto-detected
-        output_file = self.output_dir / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+        output = load_yaml(tmp_path / "output" / "compiled_semantic_models.yml")
             
         # Should have one semantic model for fct_sessions
         assert len(output['semantic_models']) == 1
         assert output['semantic_models'][0]['name'] == 'sem_fct_sessions'
         
-    def test_ratio_template_with_override(self):
+    def test_ratio_template_with_override(self, tmp_path, make_compiler, load_yaml):
         """Test that metric-level fields override template fields"""
         content = """
 version: 1
@@ -206,15 +184,14 @@ metrics:
         type: sum  # Override count with sum
         column: value
 """
-        self.create_test_file("override_template.yml", content)
+        self.create_test_file(tmp_path, "override_template.yml", content)
         
-        config = CompilerConfig(
-            input_dir=self.temp_dir,
-            output_dir=str(self.output_dir),
+        compiler = make_compiler(
+            input_dir=str(tmp_path),
+            output_dir=str(tmp_path / "output"),
             split_files=False,
             validate=False
         )
-        compiler = BetterDBTCompiler(config)
         results = compiler.compile_directory()
         
         # Should compile successfully
@@ -222,9 +199,7 @@ metrics:
         assert results['metrics_compiled'] == 1
         
         # Check output
-        output_file = self.output_dir / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
+        output = load_yaml(tmp_path / "output" / "compiled_semantic_models.yml")
             
         metric = output['metrics'][0]
         assert metric['label'] == 'Success Rate'  # Override worked
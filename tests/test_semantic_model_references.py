@@ -1,40 +1,14 @@
 """Test metrics referencing semantic models"""
 
 import pytest
-import yaml
-from pathlib import Path
-import tempfile
-import shutil
 
-from core.compiler import BetterDBTCompiler, CompilerConfig
+from tests.helpers import by_name, link_tree, materialize
 
 
-class TestSemanticModelReferences:
-    """Test the new metric syntax that references semantic models"""
-    
-    @pytest.fixture
-    def temp_dir(self):
-        """Create a temporary directory for test files"""
-        temp_dir = tempfile.mkdtemp()
-        yield temp_dir
-        shutil.rmtree(temp_dir)
-    
-    @pytest.fixture
-    def compiler(self, temp_dir):
-        """Create a compiler instance"""
-        config = CompilerConfig(
-            input_dir=temp_dir,
-            output_dir=str(Path(temp_dir) / "output"),
-            debug=True,
-            split_files=False,
-            validate=False  # Disable validation for tests
-        )
-        return BetterDBTCompiler(config)
-    
-    def test_basic_semantic_model_reference(self, compiler, temp_dir):
-        """Test basic metric referencing a semantic model"""
-        # Create semantic model
-        semantic_model_content = """
+# Fixture files for each test case, written once per module by fixture_tree
+_FIXTURE_FILES = {
+    "basic_reference": {
+        "semantic_models.yml": """
 version: 2
 
 semantic_models:
@@ -68,10 +42,8 @@ semantic_models:
         agg: sum
         expr: revenue
         agg_time_dimension: order_date
-"""
-        
-        # Create metric using new syntax
-        metric_content = """
+""",
+        "metrics.yml": """
 version: 2
 
 metrics:
@@ -90,44 +62,10 @@ metrics:
     dimensions:
       - name: order_date
         grain: week
-"""
-        
-        # Write files
-        with open(Path(temp_dir) / "semantic_models.yml", "w") as f:
-            f.write(semantic_model_content)
-            
-        with open(Path(temp_dir) / "metrics.yml", "w") as f:
-            f.write(metric_content)
-        
-        # Compile
-        result = compiler.compile_directory()
-        
-        # Check output
-        output_file = Path(temp_dir) / "output" / "compiled_semantic_models.yml"
-        with open(output_file, 'r') as f:
-            output = yaml.safe_load(f)
-        
-        # Verify metrics were compiled correctly
-        assert 'metrics' in output
-        metrics = output['metrics']
-        
-        # Find revenue metric
-        revenue_metric = next(m for m in metrics if m['name'] == 'revenue')
-        assert revenue_metric['type'] == 'simple'
-        # For metrics referencing semantic models, the measure is in type_params
-        assert 'type_params' in revenue_metric
-        assert revenue_metric['type_params']['measure'] == 'total_revenue'
-        
-        # Find order_volume metric
-        order_metric = next(m for m in metrics if m['name'] == 'order_volume')
-        assert order_metric['type'] == 'simple'
-        assert 'type_params' in order_metric
-        assert order_metric['type_params']['measure'] == 'order_count'
-    
-    def test_cross_file_semantic_model_reference(self, compiler, temp_dir):
-        """Test metric referencing a semantic model in another file"""
-        # Create semantic model in one file
-        semantic_model_content = """
+""",
+    },
+    "cross_file_reference": {
+        "semantic_models/customers.yml": """
 version: 2
 
 semantic_models:
@@ -155,10 +93,8 @@ semantic_models:
         agg: count_distinct
         expr: customer_id
         agg_time_dimension: signup_date
-"""
-        
-        # Create metric in another file
-        metric_content = """
+""",
+        "metrics/customer_metrics.yml": """
 version: 2
 
 metrics:
@@ -168,16 +104,89 @@ metrics:
     semantic_model: customers
     measure: customer_count
     filter: "is_active = true"
-"""
+""",
+    },
+    "mixed_syntax": {
+        "test.yml": """
+version: 2
+
+semantic_models:
+  - name: sales
+    source: fct_sales
+    measures:
+      - name: sales_amount
+        agg: sum
+        expr: amount
+
+metrics:
+  # Old syntax
+  - name: total_sales_old
+    description: "Using old syntax"
+    type: simple
+    source: fct_sales
+    measure:
+      type: sum
+      column: amount
+      
+  # New syntax
+  - name: total_sales_new
+    description: "Using new syntax"
+    type: simple
+    semantic_model: sales
+    measure: sales_amount
+""",
+    },
+}
+
+
+@pytest.fixture(scope="module")
+def fixture_tree(tmp_path_factory):
+    """Write every fixture case once; tests copy their case into a fresh directory"""
+    root = tmp_path_factory.mktemp("semantic_model_references")
+    for case, files in _FIXTURE_FILES.items():
+        materialize(root / case, files)
+    return root
+
+
+@pytest.fixture
+def compiler_options():
+    """Options for the shared compiler fixture"""
+    return {'split_files': False, 'validate': False}  # Disable validation for tests
+
+
+def get_measure(metric):
+    """The measure a compiled dbt metric points at"""
+    return metric['type_params']['measure']
+
+
+class TestSemanticModelReferences:
+    """Test the new metric syntax that references semantic models"""
+    
+    def test_basic_semantic_model_reference(self, compiler, tmp_path, fixture_tree, load_yaml):
+        """Test basic metric referencing a semantic model"""
+        # Link in the prebuilt fixture files
+        link_tree(fixture_tree / "basic_reference", tmp_path)
         
-        # Write files
-        Path(temp_dir).joinpath("semantic_models").mkdir(exist_ok=True)
-        with open(Path(temp_dir) / "semantic_models" / "customers.yml", "w") as f:
-            f.write(semantic_model_content)
-            
-        Path(temp_dir).joinpath("metrics").mkdir(exist_ok=True)
-        with open(Path(temp_dir) / "metrics" / "customer_metrics.yml", "w") as f:
-            f.write(metric_content)
+        # Compile
+        compiler.compile_directory(return_summary=False)
+        
+        # Check output
+        output = load_yaml(tmp_path / "output" / "compiled_semantic_models.yml")
+        
+        # Verify metrics were compiled correctly
+        assert 'metrics' in output
+        metrics = by_name(output['metrics'])
+        
+        # For metrics referencing semantic models, the measure is in type_params
+        expected_measures = {'revenue': 'total_revenue', 'order_volume': 'order_count'}
+        for name, measure in expected_measures.items():
+            assert metrics[name]['type'] == 'simple'
+            assert get_measure(metrics[name]) == measure
+    
+    def test_cross_file_semantic_model_reference(self, compiler, tmp_path, fixture_tree):
+        """Test metric referencing a semantic model in another file"""
+        # Link in the prebuilt fixture files
+        link_tree(fixture_tree / "cross_file_reference", tmp_path)
         
         # Compile
         result = compiler.compile_directory()
@@ -186,7 +195,7 @@ metrics:
         assert result['metrics_compiled'] > 0
         assert len(result['errors']) == 0
     
-    def test_semantic_model_not_found_error(self, compiler, temp_dir):
+    def test_semantic_model_not_found_error(self, compiler, tmp_path):
         """Test error when referencing non-existent semantic model"""
         metric_content = """
 version: 2
@@ -198,8 +207,7 @@ metrics:
     measure: some_measure
 """
         
-        with open(Path(temp_dir) / "metrics.yml", "w") as f:
-            f.write(metric_content)
+        materialize(tmp_path, {"metrics.yml": metric_content})
         
         # Should raise an error
         with pytest.raises(ValueError) as exc_info:
@@ -207,7 +215,7 @@ metrics:
         
         assert "references semantic model 'non_existent_model' which doesn't exist" in str(exc_info.value)
     
-    def test_measure_not_found_error(self, compiler, temp_dir):
+    def test_measure_not_found_error(self, compiler, tmp_path):
         """Test error when referencing non-existent measure"""
         content = """
 version: 2
@@ -227,8 +235,7 @@ metrics:
     measure: non_existent_measure
 """
         
-        with open(Path(temp_dir) / "test.yml", "w") as f:
-            f.write(content)
+        materialize(tmp_path, {"test.yml": content})
         
         # Should raise an error
         with pytest.raises(ValueError) as exc_info:
@@ -236,39 +243,10 @@ metrics:
         
         assert "references measure 'non_existent_measure' which doesn't exist" in str(exc_info.value)
     
-    def test_mixed_syntax_compatibility(self, compiler, temp_dir):
+    def test_mixed_syntax_compatibility(self, compiler, tmp_path, fixture_tree):
         """Test that old and new syntax can coexist"""
-        content = """
-version: 2
-
-semantic_models:
-  - name: sales
-    source: fct_sales
-    measures:
-      - name: sales_amount
-        agg: sum
-        expr: amount
-
-metrics:
-  # Old syntax
-  - name: total_sales_old
-    description: "Using old syntax"
-    type: simple
-    source: fct_sales
-    measure:
-      type: sum
-      column: amount
-      
-  # New syntax
-  - name: total_sales_new
-    description: "Using new syntax"
-    type: simple
-    semantic_model: sales
-    measure: sales_amount
-"""
-        
-        with open(Path(temp_dir) / "test.yml", "w") as f:
-            f.write(content)
+        # Link in the prebuilt fixture files
+        link_tree(fixture_tree / "mixed_syntax", tmp_path)
         
         # Compile
         result = compiler.compile_directory()
@@ -3,26 +3,26 @@ Test table reference parsing and compilation
 """
 
 import pytest
-import yaml
 from pathlib import Path
-import tempfile
-import shutil
 
 from core.parser import BetterDBTParser
 from core.compiler import BetterDBTCompiler, CompilerConfig
+from tests.helpers import by_name, materialize
+
+
+# One parser for the module; each test points it at its own directory
+_SHARED_PARSER = BetterDBTParser(base_dir="/")
 
 
 class TestTableReferences:
     """Test table reference functionality"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _env(self, tmp_path):
         """Set up test environment"""
-        self.test_dir = tempfile.mkdtemp()
-        self.parser = BetterDBTParser(base_dir=self.test_dir)
-        
-    def teardown_method(self):
-        """Clean up test environment"""
-        shutil.rmtree(self.test_dir)
+        self.test_dir = str(tmp_path)
+        self.parser = _SHARED_PARSER
+        self.parser.base_dir = self.test_dir
     
     def test_ref_function_parsing(self):
         """Test parsing of ref() function syntax"""
@@ -35,11 +35,7 @@ metrics:
       type: sum
       column: amount
 """
-        test_file = Path(self.test_dir) / "test.yml"
-        with open(test_file, 'w') as f:
-            f.write(test_content)
-            
-        result = self.parser.parse_file(str(test_file))
+        result = self.parser.parse_string(test_content)
         
         metric = result['metrics'][0]
         assert metric['source'] == 'fct_orders'
@@ -58,11 +54,7 @@ metrics:
       type: sum
       column: revenue
 """
-        test_file = Path(self.test_dir) / "test.yml"
-        with open(test_file, 'w') as f:
-            f.write(test_content)
-            
-        result = self.parser.parse_file(str(test_file))
+        result = self.parser.parse_string(test_content)
         
         metric = result['metrics'][0]
         assert metric['source'] == 'fct_sales'
@@ -82,11 +74,7 @@ metrics:
       type: count
       column: customer_id
 """
-        test_file = Path(self.test_dir) / "test.yml"
-        with open(test_file, 'w') as f:
-            f.write(test_content)
-            
-        result = self.parser.parse_file(str(test_file))
+        result = self.parser.parse_string(test_content)
         
         metric = result['metrics'][0]
         assert metric['source'] == 'fct_customers'
@@ -106,11 +94,7 @@ metrics:
       type: sum
       column: price
 """
-        test_file = Path(self.test_dir) / "test.yml"
-        with open(test_file, 'w') as f:
-            f.write(test_content)
-            
-        result = self.parser.parse_file(str(test_file))
+        result = self.parser.parse_string(test_content)
         
         metric = result['metrics'][0]
         assert metric['source'] == 'fct_products'
@@ -129,11 +113,7 @@ metrics:
       type: sum
       column: value
 """
-        test_file = Path(self.test_dir) / "test.yml"
-        with open(test_file, 'w') as f:
-            f.write(test_content)
-            
-        result = self.parser.parse_file(str(test_file))
+        result = self.parser.parse_string(test_content)
         
         metric = result['metrics'][0]
         assert metric['source'] == 'fct_traditional'
@@ -156,11 +136,7 @@ metrics:
         type: sum
         column: revenue
 """
-        test_file = Path(self.test_dir) / "test.yml"
-        with open(test_file, 'w') as f:
-            f.write(test_content)
-            
-        result = self.parser.parse_file(str(test_file))
+        result = self.parser.parse_string(test_content)
         
         metric = result['metrics'][0]
         assert metric['numerator']['source'] == 'fct_financials'
@@ -189,11 +165,7 @@ metrics:
         grain: day
 """
         metrics_dir = Path(self.test_dir) / "metrics"
-        metrics_dir.mkdir()
-        
-        test_file = metrics_dir / "test.yml"
-        with open(test_file, 'w') as f:
-            f.write(test_content)
+        materialize(metrics_dir, {"test.yml": test_content})
         
         output_dir = Path(self.test_dir) / "output"
         
@@ -209,17 +181,12 @@ metrics:
         # Mock the model scanner to avoid validation errors
         compiler._model_scanner = None
         
-        result = compiler.compile_directory()
-        
-        # Read the compiled output
-        output_file = output_dir / "compiled_semantic_models.yml"
-        assert output_file.exists()
-        
-        with open(output_file, 'r') as f:
-            compiled = yaml.safe_load(f)
+        # Inspect the compiled output in memory; nothing is written to disk
+        compiled = compiler.compile_to_dict()
+        assert not output_dir.exists()
         
         # Check that source_ref is preserved in meta
-        metric = compiled['metrics'][0]
+        metric = by_name(compiled['metrics'])['test_metric']
         assert 'meta' in metric
         assert 'source_ref' in metric['meta']
         assert metric['meta']['source_ref']['table'] == 'fct_test'
@@ -246,11 +213,7 @@ metrics:
         type: sum
         column: den_value
 """
-        test_file = Path(self.test_dir) / "test.yml"
-        with open(test_file, 'w') as f:
-            f.write(test_content)
-            
-        result = self.parser.parse_file(str(test_file))
+        result = self.parser.parse_string(test_content)
         
         metric = result['metrics'][0]
         
@@ -2,11 +2,10 @@
 
 import pytest
 import yaml
-from pathlib import Path
-import tempfile
-import shutil
+from jinja2 import Environment
 
 from features.templates import TemplateEngine, TemplateLibrary, TemplateParameter, MetricTemplate
+from tests.helpers import materialize
 
 
 class TestTemplateEngine:
@@ -127,23 +126,65 @@ class TestTemplateEngine:
         assert result['dimensions'][0]['name'] == 'customer_segment'
         assert result['dimensions'][0]['type'] == 'categorical'
         assert result['dimensions'][0]['expr'] == 'table.customer_segment'
-        
 
-class TestTemplateLibrary:
-    """Test the TemplateLibrary functionality"""
-    
-    def setup_method(self):
-        """Setup test fixtures"""
-        self.temp_dir = tempfile.mkdtemp()
-        self.library = TemplateLibrary([self.temp_dir])
+        # The result shares no containers with the template
+        template = self.engine.templates['dimension'].template
+        result['dimensions'][0]['name'] = 'changed'
+        assert template['dimensions'][0]['name'] == '{{ DIM_NAME }}'
+        assert result['dimensions'] is not template['dimensions']
+
+    def test_pure_placeholder_matches_jinja_rendering(self):
+        """Test that lone {{ name }} placeholders expand the same as full Jinja rendering"""
+        params = {'TABLE': 'fct_orders', 'LIMIT': 10, 'FLAGS': ['a', 'b'], 'RATE': 0.5, 'CODE': '007'}
         
-    def teardown_method(self):
-        """Cleanup temp files"""
-        shutil.rmtree(self.temp_dir)
+        for name in params:
+            template_str = '{{ ' + name + ' }}'
+            jinja_result = self.engine._literal_or_string(
+                self.engine.jinja_env.from_string(template_str).render(**params)
+            )
+            assert self.engine._expand_string_template(template_str, params) == jinja_result
+            
+        # Anything beyond a lone placeholder still goes through Jinja
+        assert self.engine._expand_string_template('{{ TABLE | upper }}', params) == 'FCT_ORDERS'
+        assert self.engine._expand_string_template('{{ MISSING }}', params) == ''
         
-    def test_load_templates_from_file(self):
-        """Test loading templates from YAML files"""
-        template_content = """
+    def test_compiled_templates_are_reused(self):
+        """Test that each template string is compiled by Jinja only once"""
+        template_str = "{{ COLUMN | sql_quote }} IS NOT NULL"
+        
+        first = self.engine._expand_string_template(template_str, {'COLUMN': 'a'})
+        misses = self.engine._compile_template.cache_info().misses
+        second = self.engine._expand_string_template(template_str, {'COLUMN': 'b'})
+        
+        assert (first, second) == ("'a' IS NOT NULL", "'b' IS NOT NULL")
+        assert self.engine._compile_template.cache_info().misses == misses
+        
+    def test_engines_share_jinja_environment(self):
+        """Test that engines reuse one Jinja environment and its compiled templates"""
+        other = TemplateEngine()
+        template_str = "{{ TABLE | sql_quote }}"
+        self.engine._expand_string_template(template_str, {'TABLE': 'a'})
+        
+        assert other.jinja_env is self.engine.jinja_env
+        assert other._compile_template(template_str) is self.engine._compile_template(template_str)
+        
+        # An engine given its own environment compiles with that one
+        isolated = TemplateEngine(jinja_env=Environment())
+        assert isolated._compile_template.cache_info().currsize == 0
+        assert isolated._expand_string_template("{{ TABLE | upper }}", {'TABLE': 'a'}) == 'A'
+        
+    def test_cached_literals_are_not_shared(self):
+        """Test that container literals parsed from the cache are fresh per expansion"""
+        first = self.engine._expand_string_template('{{ FLAGS }}', {'FLAGS': ['a', 'b']})
+        first.append('c')
+        second = self.engine._expand_string_template('{{ FLAGS }}', {'FLAGS': ['a', 'b']})
+        
+        assert second == ['a', 'b']
+        
+
+# Template files loaded once into the module-scoped library fixture
+_LIBRARY_FILES = {
+    "templates.yml": """
 metric_templates:
   revenue_base:
     description: "Base revenue metric template"
@@ -168,22 +209,8 @@ metric_templates:
     template:
       type: conversion
       source: "{{ EVENT_TABLE }}"
-"""
-        
-        template_file = Path(self.temp_dir) / "templates.yml"
-        with open(template_file, 'w') as f:
-            f.write(template_content)
-            
-        self.library.load_templates()
-        
-        # Check templates were loaded
-        templates = self.library.list_templates()
-        assert 'revenue_base' in templates
-        assert 'conversion_base' in templates
-        
-    def test_expand_template(self):
-        """Test expanding a template from the library"""
-        template_content = """
+""",
+    "test.yml": """
 metric_templates:
   test_metric:
     description: "Test metric"
@@ -194,22 +221,8 @@ metric_templates:
       source: "{{ TABLE }}"
       measure:
         type: count
-"""
-        
-        template_file = Path(self.temp_dir) / "test.yml"
-        with open(template_file, 'w') as f:
-            f.write(template_content)
-            
-        self.library.load_templates()
-        
-        result = self.library.expand('test_metric', {'TABLE': 'fct_events'})
-        
-        assert result['source'] == 'fct_events'
-        assert result['measure']['type'] == 'count'
-        
-    def test_get_template_info(self):
-        """Test getting template information"""
-        template_content = """
+""",
+    "info.yml": """
 metric_templates:
   info_test:
     description: "Template with info"
@@ -224,18 +237,80 @@ metric_templates:
         description: "Second parameter"
     template:
       value: "test"
+""",
+}
+
+
+# A library file defining one metric template, filled with str.format
+_NAMED_LIBRARY_TEMPLATE = """
+metric_templates:
+  {name}:
+    template:
+      source: {source}
 """
+
+
+@pytest.fixture(scope="module")
+def library(tmp_path_factory):
+    """A TemplateLibrary loaded from every file in _LIBRARY_FILES; tests only read it"""
+    template_dir = tmp_path_factory.mktemp("template_library")
+    materialize(template_dir, _LIBRARY_FILES)
+    library = TemplateLibrary([str(template_dir)])
+    library.load_templates()
+    return library
+
+
+class TestTemplateLibrary:
+    """Test the TemplateLibrary functionality"""
+    
+    def test_load_templates_from_file(self, library):
+        """Test loading templates from YAML files"""
+        # Check templates were loaded
+        templates = library.list_templates()
+        assert 'revenue_base' in templates
+        assert 'conversion_base' in templates
         
-        template_file = Path(self.temp_dir) / "info.yml"
-        with open(template_file, 'w') as f:
-            f.write(template_content)
-            
-        self.library.load_templates()
+    def test_expand_template(self, library):
+        """Test expanding a template from the library"""
+        result = library.expand('test_metric', {'TABLE': 'fct_events'})
+        
+        assert result['source'] == 'fct_events'
+        assert result['measure']['type'] == 'count'
         
-        info = self.library.get_template_info('info_test')
+    def test_get_template_info(self, library):
+        """Test getting template information"""
+        info = library.get_template_info('info_test')
         
         assert info['description'] == "Template with info"
         assert len(info['parameters']) == 2
         assert info['parameters'][0]['name'] == 'PARAM1'
         assert info['parameters'][0]['required'] == True
-        assert info['parameters'][1]['default'] == 100
\ No newline at end of file
+        assert info['parameters'][1]['default'] == 100
+        
+    def test_template_bodies_load_on_demand(self, tmp_path):
+        """Test that listing templates indexes names without loading template bodies"""
+        materialize(tmp_path, _LIBRARY_FILES)
+        library = TemplateLibrary([str(tmp_path)])
+        
+        assert set(library.list_templates()) == {'revenue_base', 'conversion_base', 'test_metric', 'info_test'}
+        assert library.engine.templates == {}
+        
+        # Using a template loads only the file that defines it
+        library.expand('test_metric', {'TABLE': 'fct_events'})
+        assert set(library.engine.templates) == {'test_metric'}
+        
+    def test_inline_template_overrides_library(self, tmp_path):
+        """Test that a template registered after indexing wins over a library file loaded later"""
+        materialize(tmp_path, {
+            "a_lib1.yml": _NAMED_LIBRARY_TEMPLATE.format(name="U", source="lib_u_source"),
+            "b_lib2.yml": _NAMED_LIBRARY_TEMPLATE.format(name="T", source="lib_t_source"),
+        })
+        library = TemplateLibrary([str(tmp_path)])
+        library.load_templates()
+        
+        library.expand('U', {})
+        library.engine.register_template('T', {'template': {'source': 'inline_source'}})
+        
+        assert library.expand('T', {})['source'] == 'inline_source'
+        assert library.expand('U', {})['source'] == 'lib_u_source'
+
@@ -1,34 +1,19 @@
 """
 Tests for time spine configuration
+
+Every case compiles a single metrics file, so the cases share one test body
+and differ only in their YAML and the checks run against the compiler.
 """
 
 import pytest
 import yaml
 from pathlib import Path
-import tempfile
-import shutil
 
-from src.core.compiler import BetterDBTCompiler, CompilerConfig
+# libyaml's loader when PyYAML was built with it
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 
-class TestTimeSpine:
-    """Test time spine configuration for metrics"""
-    
-    def setup_method(self):
-        """Set up test fixtures"""
-        self.test_dir = tempfile.mkdtemp()
-        self.metrics_dir = Path(self.test_dir) / "metrics"
-        self.metrics_dir.mkdir(parents=True)
-        self.output_dir = Path(self.test_dir) / "output"
-        
-    def teardown_method(self):
-        """Clean up test fixtures"""
-        shutil.rmtree(self.test_dir)
-        
-    def test_default_time_spine(self):
-        """Test default time spine configuration"""
-        metrics_file = self.metrics_dir / "test_time_spine.yml"
-        metrics_file.write_text("""
+_DEFAULT_YAML = """
 version: 2
 
 time_spine:
@@ -52,38 +37,32 @@ metrics:
         type: time
         grain: day
     time_spine: default
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check time spine was registered
-        assert 'default' in compiler.time_spines
-        assert compiler.time_spines['default']['model'] == "ref('dim_date')"
-        
-        # Check semantic model has time spine configuration
-        semantic_model = compiler.semantic_models[0]
-        assert 'time_spine_table_configurations' in semantic_model
-        time_configs = semantic_model['time_spine_table_configurations']
-        
-        # Should have configurations for each grain
-        grains = [tc['grain'] for tc in time_configs]
-        assert 'day' in grains
-        assert 'week' in grains
-        assert 'month' in grains
-        assert 'year' in grains
-        
-        # Check location
-        assert all(tc['location'] == "ref('dim_date')" for tc in time_configs)
-        
-    def test_custom_time_spine(self):
-        """Test custom time spine for hourly metrics"""
-        metrics_file = self.metrics_dir / "test_hourly_spine.yml"
-        metrics_file.write_text("""
+"""
+
+
+def _check_default(compiler):
+    """Default time spine configuration"""
+    # Check time spine was registered
+    assert 'default' in compiler.time_spines
+    assert compiler.time_spines['default']['model'] == "ref('dim_date')"
+    
+    # Check semantic model has time spine configuration
+    semantic_model = compiler.semantic_models[0]
+    assert 'time_spine_table_configurations' in semantic_model
+    time_configs = semantic_model['time_spine_table_configurations']
+    
+    # Should have configurations for each grain
+    grains = [tc['grain'] for tc in time_configs]
+    assert 'day' in grains
+    assert 'week' in grains
+    assert 'month' in grains
+    assert 'year' in grains
+    
+    # Check location
+    assert all(tc['location'] == "ref('dim_date')" for tc in time_configs)
+
+
+_CUSTOM_YAML = """
 version: 2
 
 time_spine:
@@ -107,32 +86,31 @@ metrics:
         type: time
         grain: hour
     time_spine: hourly
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check custom spine was registered
-        assert 'hourly' in compiler.time_spines
-        assert compiler.time_spines['hourly']['meta']['timezone'] == 'UTC'
-        
-        # Check metric configuration
-        metric = next(m for m in compiler.compiled_metrics if m['name'] == 'hourly_traffic')
-        assert metric['time_spine'] == 'hourly'
-        
-        # Check compiled metric has time spine in config
-        output_metrics = yaml.safe_load((self.output_dir / "_metrics.yml").read_text())
-        compiled_metric = next(m for m in output_metrics['metrics'] if m['name'] == 'hourly_traffic')
-        assert compiled_metric['config']['time_spine'] == 'hourly'
-        
-    def test_inline_time_spine(self):
-        """Test inline time spine definition in metric"""
-        metrics_file = self.metrics_dir / "test_inline_spine.yml"
-        metrics_file.write_text("""
+"""
+
+
+def _check_custom(compiler):
+    """Custom time spine for hourly metrics"""
+    # Check custom spine was registered
+    assert 'hourly' in compiler.time_spines
+    assert compiler.time_spines['hourly']['meta']['timezone'] == 'UTC'
+    
+    # Check metric configuration
+    metric = compiler.compiled_metrics_by_name['hourly_traffic']
+    assert metric['time_spine'] == 'hourly'
+    
+    # Check compiled metric has time spine in config, read from the
+    # compiler's in-memory output rather than the file it wrote
+    compiled_metric = next(m for m in compiler.compiled_output['metrics'] if m['name'] == 'hourly_traffic')
+    assert compiled_metric['config']['time_spine'] == 'hourly'
+    
+    # The written file round-trips to the same metrics
+    output_file = Path(compiler.config.output_dir) / "_metrics.yml"
+    output_metrics = yaml.load(output_file.read_text(), Loader=Loader)
+    assert output_metrics['metrics'] == compiler.compiled_output['metrics']
+
+
+_INLINE_YAML = """
 version: 2
 
 metrics:
@@ -151,28 +129,22 @@ metrics:
       columns:
         manufacturing_date: mfg_date
         manufacturing_week: mfg_week
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check semantic model has inline time spine
-        semantic_model = compiler.semantic_models[0]
-        assert 'time_spine_table_configurations' in semantic_model
-        time_configs = semantic_model['time_spine_table_configurations']
-        
-        # Should have configuration from inline definition
-        assert len(time_configs) > 0
-        assert time_configs[0]['location'] == "ref('dim_manufacturing_calendar')"
-        
-    def test_fiscal_calendar_spine(self):
-        """Test fiscal calendar time spine"""
-        metrics_file = self.metrics_dir / "test_fiscal_spine.yml"
-        metrics_file.write_text("""
+"""
+
+
+def _check_inline(compiler):
+    """Inline time spine definition in metric"""
+    # Check semantic model has inline time spine
+    semantic_model = compiler.semantic_models[0]
+    assert 'time_spine_table_configurations' in semantic_model
+    time_configs = semantic_model['time_spine_table_configurations']
+    
+    # Should have configuration from inline definition
+    assert len(time_configs) > 0
+    assert time_configs[0]['location'] == "ref('dim_manufacturing_calendar')"
+
+
+_FISCAL_CALENDAR_YAML = """
 version: 2
 
 time_spine:
@@ -201,32 +173,26 @@ metrics:
     time_spine: fiscal
     config:
       fiscal_alignment: true
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check fiscal spine metadata
-        assert 'fiscal' in compiler.time_spines
-        fiscal_spine = compiler.time_spines['fiscal']
-        assert fiscal_spine['meta']['fiscal_year_start_month'] == 4
-        assert fiscal_spine['meta']['calendar_type'] == 'fiscal'
-        
-        # Check semantic model has fiscal metadata
-        semantic_model = compiler.semantic_models[0]
-        time_configs = semantic_model['time_spine_table_configurations']
-        fiscal_configs = [tc for tc in time_configs if 'meta' in tc]
-        assert len(fiscal_configs) > 0
-        assert fiscal_configs[0]['meta']['fiscal_year_start_month'] == 4
-        
-    def test_implicit_time_spine(self):
-        """Test that metrics with time dimensions get default spine if defined"""
-        metrics_file = self.metrics_dir / "test_implicit_spine.yml"
-        metrics_file.write_text("""
+"""
+
+
+def _check_fiscal_calendar(compiler):
+    """Fiscal calendar time spine"""
+    # Check fiscal spine metadata
+    assert 'fiscal' in compiler.time_spines
+    fiscal_spine = compiler.time_spines['fiscal']
+    assert fiscal_spine['meta']['fiscal_year_start_month'] == 4
+    assert fiscal_spine['meta']['calendar_type'] == 'fiscal'
+    
+    # Check semantic model has fiscal metadata
+    semantic_model = compiler.semantic_models[0]
+    time_configs = semantic_model['time_spine_table_configurations']
+    fiscal_configs = [tc for tc in time_configs if 'meta' in tc]
+    assert len(fiscal_configs) > 0
+    assert fiscal_configs[0]['meta']['fiscal_year_start_month'] == 4
+
+
+_IMPLICIT_YAML = """
 version: 2
 
 time_spine:
@@ -248,28 +214,22 @@ metrics:
         type: time
         grain: day
     # No explicit time_spine, should use default
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check semantic model gets default time spine
-        semantic_model = compiler.semantic_models[0]
-        assert 'time_spine_table_configurations' in semantic_model
-        time_configs = semantic_model['time_spine_table_configurations']
-        
-        # Should have default spine configurations
-        assert len(time_configs) > 0
-        assert all(tc['location'] == "ref('dim_date')" for tc in time_configs)
-        
-    def test_explicit_semantic_model_time_spine(self):
-        """Test explicit time spine in semantic model definition"""
-        metrics_file = self.metrics_dir / "test_explicit_sm_spine.yml"
-        metrics_file.write_text("""
+"""
+
+
+def _check_implicit(compiler):
+    """Metrics with time dimensions get the default spine if defined"""
+    # Check semantic model gets default time spine
+    semantic_model = compiler.semantic_models[0]
+    assert 'time_spine_table_configurations' in semantic_model
+    time_configs = semantic_model['time_spine_table_configurations']
+    
+    # Should have default spine configurations
+    assert len(time_configs) > 0
+    assert all(tc['location'] == "ref('dim_date')" for tc in time_configs)
+
+
+_EXPLICIT_SEMANTIC_MODEL_YAML = """
 version: 2
 
 semantic_models:
@@ -293,33 +253,27 @@ metrics:
     measure:
       type: count
       column: order_id
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check semantic model has explicit time spine configurations
-        semantic_model = next(sm for sm in compiler.semantic_models if sm['name'] == 'orders_timeseries')
-        assert 'time_spine_table_configurations' in semantic_model
-        time_configs = semantic_model['time_spine_table_configurations']
-        
-        # Should have both regular and fiscal calendar
-        assert len(time_configs) == 2
-        assert any(tc['location'] == "ref('dim_date')" for tc in time_configs)
-        assert any(tc['location'] == "ref('dim_fiscal_calendar')" for tc in time_configs)
-        
-        # Check fiscal metadata
-        fiscal_config = next(tc for tc in time_configs if tc['location'] == "ref('dim_fiscal_calendar')")
-        assert fiscal_config['meta']['calendar_type'] == 'fiscal'
-        
-    def test_cumulative_metric_with_time_spine(self):
-        """Test cumulative metrics automatically use time spine"""
-        metrics_file = self.metrics_dir / "test_cumulative_spine.yml"
-        metrics_file.write_text("""
+"""
+
+
+def _check_explicit_semantic_model(compiler):
+    """Explicit time spine in semantic model definition"""
+    # Check semantic model has explicit time spine configurations
+    semantic_model = compiler.semantic_models_by_name['orders_timeseries']
+    assert 'time_spine_table_configurations' in semantic_model
+    time_configs = semantic_model['time_spine_table_configurations']
+    
+    # Should have both regular and fiscal calendar
+    assert len(time_configs) == 2
+    assert any(tc['location'] == "ref('dim_date')" for tc in time_configs)
+    assert any(tc['location'] == "ref('dim_fiscal_calendar')" for tc in time_configs)
+    
+    # Check fiscal metadata
+    fiscal_config = next(tc for tc in time_configs if tc['location'] == "ref('dim_fiscal_calendar')")
+    assert fiscal_config['meta']['calendar_type'] == 'fiscal'
+
+
+_CUMULATIVE_METRIC_YAML = """
 version: 2
 
 time_spine:
@@ -339,20 +293,46 @@ metrics:
     grain_to_date: month
     window: unbounded
     time_spine: default
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
+"""
+
+
+def _check_cumulative_metric(compiler):
+    """Cumulative metrics automatically use time spine"""
+    # Check cumulative metric has time spine
+    metric = compiler.compiled_metrics_by_name['cumulative_revenue']
+    assert metric['time_spine'] == 'default'
+    
+    # Check output
+    compiled_metric = next(m for m in compiler.compiled_output['metrics'] if m['name'] == 'cumulative_revenue')
+    assert compiled_metric['config']['time_spine'] == 'default'
+
+
+# (file name, metrics YAML, checks run against the compiler)
+_TIME_SPINE_CASES = [
+    pytest.param("test_time_spine.yml", _DEFAULT_YAML, _check_default, id="default"),
+    pytest.param("test_hourly_spine.yml", _CUSTOM_YAML, _check_custom, id="custom"),
+    pytest.param("test_inline_spine.yml", _INLINE_YAML, _check_inline, id="inline"),
+    pytest.param("test_fiscal_spine.yml", _FISCAL_CALENDAR_YAML, _check_fiscal_calendar, id="fiscal_calendar"),
+    pytest.param("test_implicit_spine.yml", _IMPLICIT_YAML, _check_implicit, id="implicit"),
+    pytest.param("test_explicit_sm_spine.yml", _EXPLICIT_SEMANTIC_MODEL_YAML, _check_explicit_semantic_model, id="explicit_semantic_model"),
+    pytest.param("test_cumulative_spine.yml", _CUMULATIVE_METRIC_YAML, _check_cumulative_metric, id="cumulative_metric"),
+]
+
+
+class TestTimeSpine:
+    """Test time spine configuration for metrics"""
+    
+    @pytest.mark.parametrize("file_name, metrics_yaml, check", _TIME_SPINE_CASES)
+    def test_time_spine(self, make_compiler, tmp_path, file_name, metrics_yaml, check):
+        """Compile one metrics file and run the case's checks"""
+        metrics_dir = tmp_path / "metrics"
+        metrics_dir.mkdir()
+        (metrics_dir / file_name).write_text(metrics_yaml)
+        
+        compiler = make_compiler(
+            input_dir=str(metrics_dir),
+            output_dir=str(tmp_path / "output")
         )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check cumulative metric has time spine
-        metric = next(m for m in compiler.compiled_metrics if m['name'] == 'cumulative_revenue')
-        assert metric['time_spine'] == 'default'
+        compiler.compile_directory()
         
-        # Check output
-        output_metrics = yaml.safe_load((self.output_dir / "_metrics.yml").read_text())
-        compiled_metric = next(m for m in output_metrics['metrics'] if m['name'] == 'cumulative_revenue')
-        assert compiled_metric['config']['time_spine'] == 'default'
\ No newline at end of file
+        check(compiler)
@@ -3,49 +3,88 @@ Tests for the validation framework
 """
 
 import pytest
-from pathlib import Path
-import tempfile
-import shutil
 
 from src.validation.validator import MetricsValidator, ValidationResult, ValidationError
 from src.validation.rules import (
     RequiredFieldsRule,
     ValidMetricTypeRule,
     CircularDependencyRule,
-    UniqueNamesRule
+    UniqueNamesRule,
+    ModelReferenceRule
 )
+from tests.helpers import materialize
 
 
-class TestValidationFramework:
-    """Test the validation framework"""
-    
-    def setup_method(self):
-        """Set up test fixtures"""
-        self.test_dir = tempfile.mkdtemp()
-        self.metrics_dir = Path(self.test_dir) / "metrics"
-        self.metrics_dir.mkdir(parents=True)
-        
-        # Create mock models directory to satisfy model validation
-        self.models_dir = Path(self.test_dir) / "models"
-        self.models_dir.mkdir(parents=True)
-        
-        # Create a mock dbt_project.yml
-        dbt_project = Path(self.test_dir) / "dbt_project.yml"
-        dbt_project.write_text("""
+# Fixture files, encoded once at import time
+_DBT_PROJECT_FILES = {
+    "dbt_project.yml": b"""
 name: test_project
 version: '1.0.0'
 model-paths: ["models"]
-""")
-        
-        # Create mock model files
-        (self.models_dir / "fct_orders.sql").write_text("SELECT * FROM raw.orders")
-        (self.models_dir / "fct_sales.sql").write_text("SELECT * FROM raw.sales")
-        
-    def teardown_method(self):
-        """Clean up test fixtures"""
-        shutil.rmtree(self.test_dir)
+""",
+    "models/fct_orders.sql": b"SELECT * FROM raw.orders",
+    "models/fct_sales.sql": b"SELECT * FROM raw.sales",
+}
+
+_CROSS_FILE_METRICS = {
+    # File 1
+    "file1.yml": b"""
+version: 2
+
+metrics:
+  - name: revenue
+    type: simple
+    source: fct_orders
+    measure:
+      type: sum
+      column: amount
+""",
+    # File 2 with duplicate metric
+    "file2.yml": b"""
+version: 2
+
+metrics:
+  - name: revenue  # Duplicate across files
+    type: simple
+    source: fct_sales
+    measure:
+      type: sum
+      column: total
+""",
+}
+
+
+@pytest.fixture(scope="module")
+def dbt_project(tmp_path_factory):
+    """A mock dbt project whose models satisfy model validation, built once per module"""
+    root = tmp_path_factory.mktemp("dbt_project")
+    materialize(root, _DBT_PROJECT_FILES)
+    return root
+
+
+@pytest.fixture(scope="module")
+def shared_validator(dbt_project):
+    """One validator per module, so the dbt project is scanned only once"""
+    return MetricsValidator(str(dbt_project))
+
+
+@pytest.fixture
+def validator(shared_validator):
+    """The shared validator with no files from earlier tests"""
+    shared_validator.reset()
+    return shared_validator
+
+
+class TestValidationFramework:
+    """Test the validation framework"""
+    
+    @pytest.fixture(autouse=True)
+    def _metrics_dir(self, tmp_path):
+        """Each test writes its metrics files into its own directory"""
+        self.metrics_dir = tmp_path / "metrics"
+        self.metrics_dir.mkdir()
         
-    def test_valid_metrics_file(self):
+    def test_valid_metrics_file(self, validator):
         """Test validation of a valid metrics file"""
         metrics_file = self.metrics_dir / "valid.yml"
         metrics_file.write_text("""
@@ -65,14 +104,13 @@ metrics:
         grain: day
 """)
         
-        validator = MetricsValidator(str(self.test_dir))
         result = validator.validate_file(metrics_file)
         
         assert result.is_valid
         assert len(result.errors) == 0
         assert len(result.warnings) == 0
         
-    def test_missing_required_fields(self):
+    def test_missing_required_fields(self, validator):
         """Test detection of missing required fields"""
         metrics_file = self.metrics_dir / "missing_fields.yml"
         metrics_file.write_text("""
@@ -88,7 +126,6 @@ metrics:
     # Missing numerator and denominator
 """)
         
-        validator = MetricsValidator(str(self.test_dir))
         result = validator.validate_file(metrics_file)
         
         assert not result.is_valid
@@ -100,7 +137,7 @@ metrics:
         assert any("must have a numerator" in msg for msg in error_messages)
         assert any("must have a denominator" in msg for msg in error_messages)
         
-    def test_invalid_metric_type(self):
+    def test_invalid_metric_type(self, validator):
         """Test detection of invalid metric types"""
         metrics_file = self.metrics_dir / "invalid_type.yml"
         metrics_file.write_text("""
@@ -112,13 +149,37 @@ metrics:
     source: fct_orders
 """)
         
-        validator = MetricsValidator(str(self.test_dir))
         result = validator.validate_file(metrics_file)
         
         assert not result.is_valid
         assert any("Invalid metric type 'complex'" in e.message for e in result.errors)
         
-    def test_circular_dependency_detection(self):
+    def test_error_line_numbers(self, validator):
+        """Test that errors about a metric point at the line it starts on"""
+        metrics_file = self.metrics_dir / "located.yml"
+        metrics_file.write_text("""
+version: 2
+
+metrics:
+  - name: good_metric
+    type: simple
+    source: fct_orders
+    measure:
+      type: sum
+      column: amount
+
+  - name: ratio_without_parts
+    type: ratio
+""")
+        
+        result = validator.validate_file(metrics_file)
+        
+        ratio_errors = [e for e in result.errors if "'ratio_without_parts'" in e.message]
+        assert ratio_errors
+        assert all(e.line_number == 12 for e in ratio_errors)
+        assert "located.yml:12" in str(ratio_errors[0])
+        
+    def test_circular_dependency_detection(self, validator):
         """Test detection of circular dependencies"""
         metrics_file = self.metrics_dir / "circular.yml"
         metrics_file.write_text("""
@@ -134,13 +195,13 @@ metrics:
     expression: "metric('metric_a') * 2"
 """)
         
-        validator = MetricsValidator(str(self.test_dir))
         result = validator.validate_file(metrics_file)
         
         assert not result.is_valid
         assert any("Circular dependency" in e.message for e in result.errors)
+        assert any("metric_a -> metric_b -> metric_a" in e.message for e in result.errors)
         
-    def test_duplicate_names(self):
+    def test_duplicate_names(self, validator):
         """Test detection of duplicate metric names"""
         metrics_file = self.metrics_dir / "duplicates.yml"
         metrics_file.write_text("""
@@ -162,13 +223,12 @@ metrics:
       column: total
 """)
         
-        validator = MetricsValidator(str(self.test_dir))
         result = validator.validate_file(metrics_file)
         
         assert not result.is_valid
         assert any("Duplicate metric name 'revenue'" in e.message for e in result.errors)
         
-    def test_invalid_dimension_type(self):
+    def test_invalid_dimension_type(self, validator):
         """Test detection of invalid dimension types"""
         metrics_file = self.metrics_dir / "bad_dimension.yml"
         metrics_file.write_text("""
@@ -186,13 +246,12 @@ metrics:
         type: spatial  # Invalid dimension type
 """)
         
-        validator = MetricsValidator(str(self.test_dir))
         result = validator.validate_file(metrics_file)
         
         assert not result.is_valid
         assert any("Invalid dimension type 'spatial'" in e.message for e in result.errors)
         
-    def test_time_dimension_warnings(self):
+    def test_time_dimension_warnings(self, validator):
         """Test warnings for time dimensions without grain"""
         metrics_file = self.metrics_dir / "time_no_grain.yml"
         metrics_file.write_text("""
@@ -211,14 +270,13 @@ metrics:
         # No grain specified
 """)
         
-        validator = MetricsValidator(str(self.test_dir))
         result = validator.validate_file(metrics_file)
         
         assert result.is_valid  # Warning, not error
         assert len(result.warnings) > 0
         assert any("should specify a grain" in w.message for w in result.warnings)
         
-    def test_metric_filter_references(self):
+    def test_metric_filter_references(self, validator):
         """Test validation of metric references in filters"""
         metrics_file = self.metrics_dir / "filter_refs.yml"
         metrics_file.write_text("""
@@ -249,13 +307,12 @@ metrics:
     filter: "order_total > metric('does_not_exist')"  # Invalid reference
 """)
         
-        validator = MetricsValidator(str(self.test_dir))
         result = validator.validate_file(metrics_file)
         
         assert not result.is_valid
         assert any("references unknown metric 'does_not_exist'" in e.message for e in result.errors)
         
-    def test_entity_relationship_validation(self):
+    def test_entity_relationship_validation(self, validator):
         """Test validation of entity relationships"""
         metrics_file = self.metrics_dir / "entities.yml"
         metrics_file.write_text("""
@@ -275,50 +332,43 @@ entities:
         foreign_key: product_id
 """)
         
-        validator = MetricsValidator(str(self.test_dir))
         result = validator.validate_file(metrics_file)
         
         assert not result.is_valid
         assert any("unknown entity 'customer'" in e.message for e in result.errors)
         assert any("Invalid relationship type 'invalid_type'" in e.message for e in result.errors)
         
-    def test_cross_file_validation(self):
+    def test_cross_file_validation(self, validator):
         """Test validation across multiple files"""
-        # File 1
-        file1 = self.metrics_dir / "file1.yml"
-        file1.write_text("""
-version: 2
-
-metrics:
-  - name: revenue
-    type: simple
-    source: fct_orders
-    measure:
-      type: sum
-      column: amount
-""")
-        
-        # File 2 with duplicate metric
-        file2 = self.metrics_dir / "file2.yml"
-        file2.write_text("""
-version: 2
-
-metrics:
-  - name: revenue  # Duplicate across files
-    type: simple
-    source: fct_sales
-    measure:
-      type: sum
-      column: total
-""")
+        materialize(self.metrics_dir, _CROSS_FILE_METRICS)
         
-        validator = MetricsValidator(str(self.test_dir))
         result = validator.validate_directory(self.metrics_dir)
         
         assert not result.is_valid
         assert any("defined in multiple files" in e.message for e in result.errors)
         
-    def test_yaml_error_handling(self):
+    def test_cross_source_validation(self, validator):
+        """Test that in-memory sources get the same cross-file checks as a directory"""
+        sources = {name: text.decode() for name, text in _CROSS_FILE_METRICS.items()}
+        result = validator.validate_sources(sources)
+        
+        assert not result.is_valid
+        assert any("defined in multiple files: file1.yml, file2.yml" in e.message for e in result.errors)
+        
+    def test_reset_forgets_validated_files(self, validator, tmp_path):
+        """Test that a reused validator does not carry files into the next run"""
+        first_dir = tmp_path / "first"
+        materialize(first_dir, {"file1.yml": _CROSS_FILE_METRICS["file1.yml"]})
+        materialize(self.metrics_dir, {"file2.yml": _CROSS_FILE_METRICS["file2.yml"]})
+        assert validator.validate_directory(first_dir).is_valid
+        
+        validator.reset()
+        assert validator.parsed_cache == {}
+        
+        # file1's revenue metric is no longer seen as a duplicate
+        assert validator.validate_directory(self.metrics_dir).is_valid
+        
+    def test_yaml_error_handling(self, validator):
         """Test handling of YAML syntax errors"""
         metrics_file = self.metrics_dir / "bad_yaml.yml"
         metrics_file.write_text("""
@@ -333,11 +383,11 @@ metrics:
       column: [invalid yaml syntax
 """)
         
-        validator = MetricsValidator(str(self.test_dir))
         result = validator.validate_file(metrics_file)
         
         assert not result.is_valid
         assert any("Invalid YAML" in e.message for e in result.errors)
+        assert all(e.line_number is not None for e in result.errors)
         
     def test_validation_result_string_output(self):
         """Test ValidationResult string representation"""
@@ -365,4 +415,24 @@ metrics:
         assert "Found 1 warning(s)" in output
         assert "Test error" in output
         assert "Fix it" in output
-        assert "Test warning" in output
\ No newline at end of file
+        assert "Test warning" in output
+        
+    def test_preloaded_dbt_scan_is_shared(self, dbt_project, monkeypatch):
+        """Test that validators reuse a preloaded dbt project scan"""
+        from src.validation import dbt_scanner
+        from src.validation.dbt_scanner import DBTProjectScanner
+        
+        # Keep the session's preloaded scans out of reach of clear_preloaded()
+        monkeypatch.setattr(dbt_scanner, "_PRELOADED", {})
+        
+        scanner = DBTProjectScanner.preload(str(dbt_project))
+        assert DBTProjectScanner.for_project(str(dbt_project)) is scanner
+        
+        validator = MetricsValidator(str(dbt_project))
+        result = validator.validate_source(_CROSS_FILE_METRICS["file1.yml"].decode(), "file1.yml")
+        assert not result.has_errors()
+        model_rule = next(rule for rule in validator.rules if isinstance(rule, ModelReferenceRule))
+        assert model_rule.scanner is scanner
+        
+        DBTProjectScanner.clear_preloaded()
+        assert DBTProjectScanner.for_project(str(dbt_project)) is not scanner
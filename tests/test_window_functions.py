@@ -4,31 +4,14 @@ Tests for window functions in measures
 
 import pytest
 import yaml
-from pathlib import Path
-import tempfile
-import shutil
 
-from src.core.compiler import BetterDBTCompiler, CompilerConfig
+from tests.helpers import assert_contains_all
 
+# libyaml's loader when PyYAML was built with it
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
-class TestWindowFunctions:
-    """Test window function support in measures"""
-    
-    def setup_method(self):
-        """Set up test fixtures"""
-        self.test_dir = tempfile.mkdtemp()
-        self.metrics_dir = Path(self.test_dir) / "metrics"
-        self.metrics_dir.mkdir(parents=True)
-        self.output_dir = Path(self.test_dir) / "output"
-        
-    def teardown_method(self):
-        """Clean up test fixtures"""
-        shutil.rmtree(self.test_dir)
-        
-    def test_basic_window_function(self):
-        """Test basic window function measure"""
-        metrics_file = self.metrics_dir / "test_window.yml"
-        metrics_file.write_text("""
+
+_BASIC_YAML = """
 version: 2
 
 metrics:
@@ -43,29 +26,24 @@ metrics:
       - name: order_date
         type: time
         grain: day
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check measure was compiled with window function
-        semantic_model = compiler.semantic_models[0]
-        measures = semantic_model['measures']
-        window_measure = next(m for m in measures if m['name'] == 'revenue_moving_avg_measure')
-        
-        # Check window function expression
-        assert 'AVG(order_total) OVER' in window_measure['expr']
-        assert 'ROWS BETWEEN 6 PRECEDING AND CURRENT ROW' in window_measure['expr']
-        assert window_measure['agg_params']['is_window_function'] == True
-        
-    def test_window_with_partition(self):
-        """Test window function with partition"""
-        metrics_file = self.metrics_dir / "test_partition.yml"
-        metrics_file.write_text("""
+"""
+_BASIC_DATA = yaml.load(_BASIC_YAML, Loader=Loader)
+
+
+def _check_basic(metrics, measures):
+    """Basic window function measure"""
+    # Check measure was compiled with window function
+    window_measure = measures['revenue_moving_avg_measure']
+    
+    # Check window function expression
+    assert_contains_all(
+        window_measure['expr'],
+        'AVG(order_total) OVER', 'ROWS BETWEEN 6 PRECEDING AND CURRENT ROW'
+    )
+    assert window_measure['agg_params']['is_window_function'] == True
+
+
+_PARTITION_YAML = """
 version: 2
 
 metrics:
@@ -79,25 +57,18 @@ metrics:
     dimensions:
       - name: customer_segment
         type: categorical
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check partition is preserved
-        semantic_model = compiler.semantic_models[0]
-        measure = next(m for m in semantic_model['measures'] if 'customer_rank' in m['name'])
-        assert 'PARTITION BY customer_segment' in measure['expr']
-        assert 'ORDER BY total_revenue DESC' in measure['expr']
-        
-    def test_window_with_post_aggregation(self):
-        """Test window function with post-aggregation"""
-        metrics_file = self.metrics_dir / "test_post_agg.yml"
-        metrics_file.write_text("""
+"""
+_PARTITION_DATA = yaml.load(_PARTITION_YAML, Loader=Loader)
+
+
+def _check_partition(metrics, measures):
+    """Window function with partition"""
+    # Check partition is preserved
+    measure = measures['customer_rank_measure']
+    assert_contains_all(measure['expr'], 'PARTITION BY customer_segment', 'ORDER BY total_revenue DESC')
+
+
+_POST_AGGREGATION_YAML = """
 version: 2
 
 metrics:
@@ -117,25 +88,19 @@ metrics:
     dimensions:
       - name: customer_segment
         type: categorical
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check post-aggregation is applied
-        semantic_model = compiler.semantic_models[0]
-        measure = next(m for m in semantic_model['measures'] if 'latest_order' in m['name'])
-        assert measure['agg'] == 'count_distinct'
-        assert 'ROW_NUMBER() OVER' in measure['expr']
-        
-    def test_lead_lag_functions(self):
-        """Test lead/lag window functions"""
-        metrics_file = self.metrics_dir / "test_lead_lag.yml"
-        metrics_file.write_text("""
+"""
+_POST_AGGREGATION_DATA = yaml.load(_POST_AGGREGATION_YAML, Loader=Loader)
+
+
+def _check_post_aggregation(metrics, measures):
+    """Window function with post-aggregation"""
+    # Check post-aggregation is applied
+    measure = measures['latest_order_count_measure']
+    assert measure['agg'] == 'count_distinct'
+    assert 'ROW_NUMBER() OVER' in measure['expr']
+
+
+_LEAD_LAG_YAML = """
 version: 2
 
 metrics:
@@ -150,24 +115,18 @@ metrics:
       - name: date_day
         type: time
         grain: day
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check LAG function is preserved
-        semantic_model = compiler.semantic_models[0]
-        measure = next(m for m in semantic_model['measures'] if 'revenue_change' in m['name'])
-        assert 'LAG(daily_revenue, 1, 0)' in measure['expr']
-        
-    def test_cumulative_window(self):
-        """Test cumulative sum with window function"""
-        metrics_file = self.metrics_dir / "test_cumulative.yml"
-        metrics_file.write_text("""
+"""
+_LEAD_LAG_DATA = yaml.load(_LEAD_LAG_YAML, Loader=Loader)
+
+
+def _check_lead_lag(metrics, measures):
+    """Lead/lag window functions"""
+    # Check LAG function is preserved
+    measure = measures['revenue_change_measure']
+    assert 'LAG(daily_revenue, 1, 0)' in measure['expr']
+
+
+_CUMULATIVE_YAML = """
 version: 2
 
 metrics:
@@ -187,26 +146,21 @@ metrics:
       - name: order_date
         type: time
         grain: day
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
-        )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check cumulative window is correct
-        semantic_model = compiler.semantic_models[0]
-        measure = next(m for m in semantic_model['measures'] if 'cumulative' in m['name'])
-        assert 'SUM(order_total) OVER' in measure['expr']
-        assert 'ROWS UNBOUNDED PRECEDING' in measure['expr']
-        assert "DATE_TRUNC('month', order_date)" in measure['expr']
-        
-    def test_window_in_ratio_metric(self):
-        """Test window functions in ratio metrics"""
-        metrics_file = self.metrics_dir / "test_ratio_window.yml"
-        metrics_file.write_text("""
+"""
+_CUMULATIVE_DATA = yaml.load(_CUMULATIVE_YAML, Loader=Loader)
+
+
+def _check_cumulative(metrics, measures):
+    """Cumulative sum with window function"""
+    # Check cumulative window is correct
+    measure = measures['cumulative_by_month_measure']
+    assert_contains_all(
+        measure['expr'],
+        'SUM(order_total) OVER', 'ROWS UNBOUNDED PRECEDING', "DATE_TRUNC('month', order_date)"
+    )
+
+
+_RATIO_YAML = """
 version: 2
 
 metrics:
@@ -227,29 +181,74 @@ metrics:
     dimensions:
       - name: customer_segment
         type: categorical
-""")
-        
-        config = CompilerConfig(
-            input_dir=str(self.metrics_dir),
-            output_dir=str(self.output_dir)
+"""
+_RATIO_DATA = yaml.load(_RATIO_YAML, Loader=Loader)
+
+
+def _check_ratio(metrics, measures):
+    """Window functions in ratio metrics"""
+    # Check ratio metric with window function
+    metric = metrics['revenue_share']
+    assert metric['type'] == 'ratio'
+    
+    # Check denominator has window function
+    den_measure = measures['revenue_share_denominator']
+    assert 'SUM(customer_revenue) OVER' in den_measure['expr']
+    assert den_measure['agg'] == 'max'  # Post-aggregation
+
+
+# Case id -> (file name, loaded metrics document, checks run against the
+# compiled metrics and measures by name)
+_WINDOW_CASES = {
+    "basic": ("test_window.yml", _BASIC_DATA, _check_basic),
+    "partition": ("test_partition.yml", _PARTITION_DATA, _check_partition),
+    "post_aggregation": ("test_post_agg.yml", _POST_AGGREGATION_DATA, _check_post_aggregation),
+    "lead_lag": ("test_lead_lag.yml", _LEAD_LAG_DATA, _check_lead_lag),
+    "cumulative": ("test_cumulative.yml", _CUMULATIVE_DATA, _check_cumulative),
+    "ratio": ("test_ratio_window.yml", _RATIO_DATA, _check_ratio),
+}
+
+
+@pytest.fixture(scope="module")
+def compiled_windows(make_compiler, tmp_path_factory):
+    """
+    Compile each window case on its own; case id -> (metrics by name,
+    measures by name), or the exception its compile raised
+    
+    Failures are kept rather than raised, so a case that fails
+    pre-validation fails its own test and not the others.
+    """
+    compiled = {}
+    for case, (file_name, metrics_data, _) in _WINDOW_CASES.items():
+        work_dir = tmp_path_factory.mktemp(f"window_{case}")
+        compiler = make_compiler(
+            input_dir=str(work_dir),
+            output_dir=str(work_dir / "output"),
+            debug=True
         )
-        compiler = BetterDBTCompiler(config)
-        result = compiler.compile_directory()
-        
-        # Check ratio metric with window function
-        metric = next(m for m in compiler.compiled_metrics if m['name'] == 'revenue_share')
-        assert metric['type'] == 'ratio'
-        
-        # Check denominator has window function
-        semantic_model = compiler.semantic_models[0]
-        den_measure = next(m for m in semantic_model['measures'] if 'denominator' in m['name'])
-        assert 'SUM(customer_revenue) OVER' in den_measure['expr']
-        assert den_measure['agg'] == 'max'  # Post-aggregation
+        try:
+            compiler.compile_parsed({file_name: metrics_data})
+        except Exception as e:
+            compiled[case] = e
+        else:
+            compiled[case] = (compiler.compiled_metrics_by_name, compiler.measures_by_name)
+    return compiled
+
+
+class TestWindowFunctions:
+    """Test window function support in measures; each case is compiled once per module"""
+    
+    @pytest.mark.parametrize("case", list(_WINDOW_CASES))
+    def test_window_measure(self, compiled_windows, case):
+        """Run one case's checks against its own compile"""
+        compiled = compiled_windows[case]
+        if isinstance(compiled, Exception):
+            raise compiled
+        _WINDOW_CASES[case][2](*compiled)
         
-    def test_window_validation_error(self):
+    def test_window_validation_error(self, tmp_path):
         """Test validation error for window function without expression"""
-        metrics_file = self.metrics_dir / "test_invalid_window.yml"
-        metrics_file.write_text("""
+        metrics_yaml = """
 version: 2
 
 metrics:
@@ -260,11 +259,11 @@ metrics:
       type: window
       column: order_total
       # Missing window_function
-""")
+"""
         
-        from src.validation.validator import MetricsValidator
-        validator = MetricsValidator(str(self.test_dir))
-        result = validator.validate_file(metrics_file)
+        from validation.validator import MetricsValidator
+        validator = MetricsValidator(str(tmp_path))
+        result = validator.validate_source(metrics_yaml, "test_invalid_window.yml")
         
         assert not result.is_valid
         assert any("must specify window_function" in e.message for e in result.errors)
\ No newline at end of file